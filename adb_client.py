@@ -0,0 +1,444 @@
+import logging
+import os
+import socket
+import struct
+import threading
+import uuid
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from adb_interface import TouchInterface, ADBError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADB_HOST = "127.0.0.1"
+# Same variable the adb binary uses to locate a server on a non-standard port
+DEFAULT_ADB_PORT = int(os.environ.get('ANDROID_ADB_SERVER_PORT', 5037))
+
+
+def encode_request(request: str) -> bytes:
+    """Frame a smart-socket request as its length in 4 hex digits followed by the request"""
+    payload = request.encode('utf-8')
+    return b"%04x" % len(payload) + payload
+
+
+def transport_request(serial: Optional[str]) -> str:
+    """Request switching a connection to a device, or to the only device if `serial` is None"""
+    return f"host:transport:{serial}" if serial else "host:transport-any"
+
+
+def parse_length(header: bytes) -> int:
+    """Decode the 4 hex digit length that prefixes server messages"""
+    return int(header, 16)
+
+
+def check_status(status: bytes) -> bool:
+    """
+    Interpret the 4-byte status the server answers a request with.
+
+    Returns:
+        bool: True for OKAY; False for FAIL, which is followed by a
+        length-prefixed message to pass to server_error
+
+    Raises:
+        ADBError: If the status is neither OKAY nor FAIL
+    """
+    if status == b"OKAY":
+        return True
+    if status == b"FAIL":
+        return False
+    raise ADBError(f"Unexpected ADB server status: {status!r}")
+
+
+def server_error(message: bytes) -> ADBError:
+    """The error for a FAIL status and its message"""
+    return ADBError(f"ADB server error: {message.decode('utf-8', 'replace')}")
+
+
+def shell_request(command: str) -> Tuple[str, str]:
+    """
+    Build a `shell:` service request that reports the command's exit status.
+
+    The plain shell service does not return the exit status, so the command
+    is followed by an `echo` of a unique sentinel and `$?`.
+
+    Returns:
+        Tuple of the service request and the sentinel to pass to parse_shell_output
+    """
+    sentinel = f"__ADB_STATUS_{uuid.uuid4().hex}__"
+    return f"shell:{command} 2>&1; echo \"{sentinel}$?\"", sentinel
+
+
+def parse_shell_output(output: str, sentinel: str) -> str:
+    """
+    Split the output of a shell_request command from its exit status.
+
+    Returns:
+        str: The command's output
+
+    Raises:
+        ADBError: If the sentinel is missing or the command exited with a non-zero status
+    """
+    index = output.rfind(sentinel)
+    if index == -1:
+        raise ADBError("ADB shell output truncated")
+    status = output[index + len(sentinel):].strip()
+    output = output[:index]
+    if status != "0":
+        logger.error(f"ADB command failed: {output}")
+        raise ADBError(f"ADB command failed: {output}")
+    return output
+
+
+class AdbConnection:
+    """
+    A single TCP connection to the adb server speaking the smart-socket protocol.
+
+    Requests are sent as a 4 hex digit length followed by the request string, and
+    the server answers with "OKAY" or "FAIL" followed by a length-prefixed message.
+    """
+
+    def __init__(self, host: str = DEFAULT_ADB_HOST, port: int = DEFAULT_ADB_PORT, timeout: float = 30.0):
+        try:
+            self.sock = socket.create_connection((host, port), timeout=timeout)
+        except OSError as e:
+            raise ADBError(f"Cannot connect to adb server at {host}:{port}: {e}")
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send_request(self, request: str) -> None:
+        """
+        Send a host request and wait for the server to acknowledge it.
+
+        Args:
+            request: Request string, e.g. "host:devices" or "shell:ls"
+
+        Raises:
+            ADBError: If the server rejects the request
+        """
+        self._send(encode_request(request))
+        self.read_status()
+
+    def read_status(self) -> None:
+        """
+        Read an OKAY/FAIL status from the server.
+
+        Raises:
+            ADBError: If the server answered FAIL or an unexpected status
+        """
+        if not check_status(self.read_exact(4)):
+            raise server_error(self.read_length_prefixed())
+
+    def read_length_prefixed(self) -> bytes:
+        """Read a payload prefixed by a 4 hex digit length"""
+        return self.read_exact(parse_length(self.read_exact(4)))
+
+    def read_exact(self, size: int) -> bytes:
+        """
+        Read exactly `size` bytes from the connection.
+
+        Raises:
+            ADBError: If the connection closes early
+        """
+        chunks = []
+        remaining = size
+        while remaining:
+            chunk = self._recv(remaining)
+            if not chunk:
+                raise ADBError("ADB server closed the connection")
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def read_all(self) -> bytes:
+        """Read until the server closes the connection"""
+        chunks = []
+        while True:
+            chunk = self._recv(65536)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def send_raw(self, data: bytes) -> None:
+        """Write raw bytes to the connection (used by the sync protocol)"""
+        self._send(data)
+
+    def close(self) -> None:
+        """Close the underlying socket"""
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def _send(self, data: bytes) -> None:
+        try:
+            self.sock.sendall(data)
+        except OSError as e:
+            raise ADBError(f"ADB socket write failed: {e}")
+
+    def _recv(self, size: int) -> bytes:
+        try:
+            return self.sock.recv(size)
+        except OSError as e:
+            raise ADBError(f"ADB socket read failed: {e}")
+
+
+class AdbConnectionPool:
+    """
+    Keeps pre-opened connections already switched to a device transport.
+
+    A transport connection is consumed by the service it runs, so the pool is a
+    stock of warm sockets: every acquire hands one out and a background thread
+    opens its replacement, keeping the connect + `host:transport` round trips off
+    the critical path of the next command.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float, size: int = 2):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.size = size
+        self._idle: Dict[Optional[str], Deque[AdbConnection]] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def open_transport(self, serial: Optional[str]) -> AdbConnection:
+        """Open a new connection bound to the device transport"""
+        connection = AdbConnection(self.host, self.port, self.timeout)
+        try:
+            connection.send_request(transport_request(serial))
+        except ADBError:
+            connection.close()
+            raise
+        return connection
+
+    def acquire(self, serial: Optional[str]) -> AdbConnection:
+        """
+        Take a warm connection for the device, opening one if none is idle.
+
+        Args:
+            serial: Device serial, or None for the single connected device
+        """
+        with self._lock:
+            idle = self._idle[serial]
+            connection = idle.popleft() if idle else None
+
+        if self.size > 0:
+            threading.Thread(target=self._replenish, args=(serial,), daemon=True).start()
+
+        return connection if connection is not None else self.open_transport(serial)
+
+    def _replenish(self, serial: Optional[str]) -> None:
+        with self._lock:
+            if len(self._idle[serial]) >= self.size:
+                return
+        try:
+            connection = self.open_transport(serial)
+        except ADBError as e:
+            logger.debug(f"Could not pre-open ADB connection: {e}")
+            return
+        with self._lock:
+            if len(self._idle[serial]) < self.size:
+                self._idle[serial].append(connection)
+                return
+        connection.close()
+
+    def close(self) -> None:
+        """Close every idle connection"""
+        with self._lock:
+            for idle in self._idle.values():
+                while idle:
+                    idle.popleft().close()
+
+
+class AdbClient:
+    """
+    Pure-Python client for the adb server's TCP smart-socket protocol.
+
+    Talks to the adb server directly instead of spawning the adb binary, so the
+    per-command cost is a local socket round trip.
+
+    Attributes:
+        host (str): adb server host
+        port (int): adb server port
+    """
+
+    def __init__(
+            self,
+            host: str = DEFAULT_ADB_HOST,
+            port: int = DEFAULT_ADB_PORT,
+            timeout: float = 30.0,
+            pool_size: int = 2
+    ):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.pool = AdbConnectionPool(host, port, timeout, pool_size)
+
+    def devices(self) -> List[Tuple[str, str]]:
+        """
+        List devices known to the adb server.
+
+        Returns:
+            List of (serial, state) tuples
+        """
+        connection = AdbConnection(self.host, self.port, self.timeout)
+        try:
+            connection.send_request("host:devices")
+            listing = connection.read_length_prefixed().decode('utf-8')
+        finally:
+            connection.close()
+
+        return [tuple(line.split('\t')[:2]) for line in listing.splitlines() if line.strip()]
+
+    def _open_service(self, serial: Optional[str], service: str) -> AdbConnection:
+        """Start a device service, retrying once if a pooled connection went stale"""
+        connection = self.pool.acquire(serial)
+        try:
+            connection.send_request(service)
+            return connection
+        except ADBError:
+            connection.close()
+
+        connection = self.pool.open_transport(serial)
+        try:
+            connection.send_request(service)
+        except ADBError:
+            connection.close()
+            raise
+        return connection
+
+    def exec_out(self, serial: Optional[str], command: str) -> bytes:
+        """
+        Run a command with the raw `exec:` service and return its binary-safe stdout.
+
+        Args:
+            serial: Device serial, or None for the single connected device
+            command: Shell command line
+        """
+        connection = self._open_service(serial, f"exec:{command}")
+        try:
+            return connection.read_all()
+        finally:
+            connection.close()
+
+    def shell(self, serial: Optional[str], command: str) -> str:
+        """
+        Run a shell command and return its output.
+
+        Args:
+            serial: Device serial, or None for the single connected device
+            command: Shell command line
+
+        Raises:
+            ADBError: If the command exits with a non-zero status
+        """
+        service, sentinel = shell_request(command)
+        connection = self._open_service(serial, service)
+        try:
+            output = connection.read_all().decode('utf-8', 'replace')
+        finally:
+            connection.close()
+        return parse_shell_output(output, sentinel)
+
+    def pull(self, serial: Optional[str], remote_path: str, local_path: str) -> None:
+        """
+        Copy a file from the device using the `sync:` service.
+
+        Args:
+            serial: Device serial, or None for the single connected device
+            remote_path: Path of the file on the device
+            local_path: Destination path on the host
+        """
+        if os.path.isdir(local_path):
+            local_path = os.path.join(local_path, os.path.basename(remote_path))
+
+        connection = self._open_service(serial, "sync:")
+        try:
+            path = remote_path.encode('utf-8')
+            connection.send_raw(b"RECV" + struct.pack("<I", len(path)) + path)
+
+            with open(local_path, 'wb') as f:
+                while True:
+                    header = connection.read_exact(8)
+                    tag, length = header[:4], struct.unpack("<I", header[4:])[0]
+                    if tag == b"DATA":
+                        f.write(connection.read_exact(length))
+                    elif tag == b"DONE":
+                        break
+                    elif tag == b"FAIL":
+                        message = connection.read_exact(length).decode('utf-8', 'replace')
+                        raise ADBError(f"ADB pull failed: {message}")
+                    else:
+                        raise ADBError(f"Unexpected sync response: {tag!r}")
+
+            connection.send_raw(b"QUIT" + struct.pack("<I", 0))
+        finally:
+            connection.close()
+
+    def close(self) -> None:
+        """Close pooled connections"""
+        self.pool.close()
+
+
+class SocketTouchInterface(TouchInterface):
+    """
+    TouchInterface that talks to the adb server over its TCP protocol.
+
+    Does not need the adb binary or ANDROID_HOME; only a running adb server.
+    """
+
+    def __init__(
+            self,
+            device_id: Optional[str] = None,
+            host: str = DEFAULT_ADB_HOST,
+            port: int = DEFAULT_ADB_PORT,
+            pool_size: int = 2
+    ):
+        """
+        Initialize the interface against an adb server.
+
+        Args:
+            device_id: Optional device serial number for targeting a specific device
+            host: adb server host
+            port: adb server port
+            pool_size: Number of warm connections kept per device
+
+        Raises:
+            ADBError: If no devices are connected or multiple devices without specified ID
+        """
+        self.device_id = device_id
+        self.adb_path = None
+        self.client = AdbClient(host=host, port=port, pool_size=pool_size)
+        self._verify_device_connection()
+
+    def _run_adb_command(self, command: list) -> str:
+        """
+        Execute an adb command line over the socket protocol.
+
+        Supports the subset of adb commands issued by TouchInterface:
+        `devices`, `shell`, `exec-out` and `pull`.
+
+        Args:
+            command: List of command components
+
+        Returns:
+            str: Command output
+
+        Raises:
+            ADBError: If command execution fails or is unsupported
+        """
+        name, args = command[0], command[1:]
+        if name == 'devices':
+            listing = "".join(f"{serial}\t{state}\n" for serial, state in self.client.devices())
+            return "List of devices attached\n" + listing
+        if name == 'shell':
+            return self.client.shell(self.device_id, " ".join(args))
+        if name == 'exec-out':
+            return self.client.exec_out(self.device_id, " ".join(args)).decode('utf-8', 'replace')
+        if name == 'pull' and len(args) == 2:
+            self.client.pull(self.device_id, args[0], args[1])
+            return ""
+        raise ADBError(f"Unsupported command for socket backend: {' '.join(command)}")
+
+    def close(self) -> None:
+        """Close pooled adb server connections"""
+        self.client.close()
@@ -2,7 +2,12 @@ from dataclasses import dataclass
 import subprocess
 import logging
 import os
-from typing import Optional, Tuple, Union
+import queue
+import re
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional, Tuple, Union
 from enum import IntEnum
 
 logger = logging.getLogger(__name__)
@@ -38,11 +43,127 @@ class Coordinates:
             raise ValueError(f"Coordinates must be non-negative. Got x={self.x}, y={self.y}")
 
 
+@dataclass
+class TouchPanel:
+    """
+    A multi-touch input device and the mapping from screen pixels to its axes.
+
+    Used to inject touches with `sendevent`, which writes raw events to the
+    device node and avoids starting the Java `input` tool for every tap.
+    Assumes the display is in its natural orientation.
+    """
+    device: str
+    min_x: int
+    max_x: int
+    min_y: int
+    max_y: int
+    screen_width: int
+    screen_height: int
+    has_btn_touch: bool = True
+
+    EV_SYN = 0
+    EV_KEY = 1
+    EV_ABS = 3
+    BTN_TOUCH = 330
+    ABS_MT_POSITION_X = 53
+    ABS_MT_POSITION_Y = 54
+    ABS_MT_TRACKING_ID = 57
+    RELEASED = 4294967295  # -1 as the unsigned value sendevent expects
+    MAX_SWIPE_STEPS = 20
+
+    def to_panel(self, x: int, y: int) -> Tuple[int, int]:
+        """Scale screen pixel coordinates to touch panel axis values"""
+        panel_x = self.min_x + x * (self.max_x - self.min_x) // max(1, self.screen_width - 1)
+        panel_y = self.min_y + y * (self.max_y - self.min_y) // max(1, self.screen_height - 1)
+        return min(panel_x, self.max_x), min(panel_y, self.max_y)
+
+    def _event(self, event_type: int, code: int, value: int) -> str:
+        return f"sendevent {self.device} {event_type} {code} {value}"
+
+    def _move(self, x: int, y: int) -> List[str]:
+        panel_x, panel_y = self.to_panel(x, y)
+        return [
+            self._event(self.EV_ABS, self.ABS_MT_POSITION_X, panel_x),
+            self._event(self.EV_ABS, self.ABS_MT_POSITION_Y, panel_y),
+            self._event(self.EV_SYN, 0, 0)
+        ]
+
+    def _down(self, x: int, y: int) -> List[str]:
+        events = [self._event(self.EV_ABS, self.ABS_MT_TRACKING_ID, 0)]
+        if self.has_btn_touch:
+            events.append(self._event(self.EV_KEY, self.BTN_TOUCH, 1))
+        return events + self._move(x, y)
+
+    def _up(self) -> List[str]:
+        events = [self._event(self.EV_ABS, self.ABS_MT_TRACKING_ID, self.RELEASED)]
+        if self.has_btn_touch:
+            events.append(self._event(self.EV_KEY, self.BTN_TOUCH, 0))
+        return events + [self._event(self.EV_SYN, 0, 0)]
+
+    def tap_script(self, x: int, y: int) -> str:
+        """Shell script performing a tap at screen coordinates"""
+        return "; ".join(self._down(x, y) + self._up())
+
+    def swipe_script(self, x1: int, y1: int, x2: int, y2: int, duration_ms: int) -> str:
+        """Shell script performing a swipe between screen coordinates"""
+        steps = max(1, min(self.MAX_SWIPE_STEPS, duration_ms // 16))
+        pause = f"sleep {duration_ms / 1000 / steps:.3f}"
+        events = self._down(x1, y1)
+        for step in range(1, steps + 1):
+            events.append(pause)
+            events += self._move(x1 + (x2 - x1) * step // steps, y1 + (y2 - y1) * step // steps)
+        return "; ".join(events + self._up())
+
+
+def parse_touch_panel(getevent_output: str, wm_size_output: str) -> Optional[TouchPanel]:
+    """
+    Find the multi-touch device in `getevent -pl` output and pair it with the screen size.
+
+    Args:
+        getevent_output: Output of `getevent -pl`
+        wm_size_output: Output of `wm size`
+
+    Returns:
+        TouchPanel for the first device reporting ABS_MT_POSITION_X/Y, or None
+    """
+    sizes = dict(re.findall(r'(Physical|Override) size:\s*(\d+x\d+)', wm_size_output))
+    size = sizes.get('Override') or sizes.get('Physical')
+    if not size:
+        return None
+    screen_width, screen_height = map(int, size.split('x'))
+
+    axis_pattern = re.compile(r'(ABS_MT_POSITION_[XY])\s*:\s*value -?\d+, min (-?\d+), max (-?\d+)')
+    for block in re.split(r'^add device \d+: ', getevent_output, flags=re.MULTILINE)[1:]:
+        axes = {name: (int(low), int(high)) for name, low, high in axis_pattern.findall(block)}
+        if 'ABS_MT_POSITION_X' in axes and 'ABS_MT_POSITION_Y' in axes:
+            return TouchPanel(
+                device=block.split('\n', 1)[0].strip(),
+                min_x=axes['ABS_MT_POSITION_X'][0],
+                max_x=axes['ABS_MT_POSITION_X'][1],
+                min_y=axes['ABS_MT_POSITION_Y'][0],
+                max_y=axes['ABS_MT_POSITION_Y'][1],
+                screen_width=screen_width,
+                screen_height=screen_height,
+                has_btn_touch='BTN_TOUCH' in block
+            )
+    return None
+
+
 class ADBError(Exception):
     """Custom exception for ADB-related errors"""
     pass
 
 
+class ADBSessionError(ADBError):
+    """Raised when a persistent ADB shell session is broken or unresponsive"""
+    pass
+
+
+class ADBSessionInterrupted(ADBSessionError):
+    """Raised when a session broke after a command was sent to it, so the command may have run"""
+    pass
+
+
 class TouchInterface:
     """
     Handles screen inputs for Android devices via ADB.
@@ -55,6 +176,10 @@ class TouchInterface:
         device_id (Optional[str]): Specific device identifier for multi-device setups
     """
 
+    _batch: Optional[List[str]] = None
+    _touch_panel: Optional[TouchPanel] = None
+    _text_engine = None
+
     def __init__(self, device_id: Optional[str] = None):
         """
         Initialize the TouchInterface with optional device targeting.
@@ -70,7 +195,12 @@ class TouchInterface:
         self.adb_path = self._get_adb_path()
         self._verify_device_connection()
 
-    def _get_adb_path(self) -> str:
+    def close(self) -> None:
+        """Release any resources held by the interface"""
+        pass
+
+    @staticmethod
+    def _get_adb_path() -> str:
         """
         Locate the ADB executable path.
 
@@ -140,6 +270,81 @@ class TouchInterface:
             logger.error(f"ADB command failed: {e.stderr}")
             raise ADBError(f"ADB command failed: {e.stderr}")
 
+    def _run_shell_command(self, command: List[str]) -> str:
+        """
+        Execute a device shell command, or queue it while a batch is open.
+
+        Args:
+            command: List of shell command components (without the leading 'shell')
+
+        Returns:
+            str: Command output (empty when queued)
+        """
+        if self._batch is not None:
+            self._batch.append(' '.join(command))
+            return ""
+        return self._run_adb_command(['shell'] + command)
+
+    @contextmanager
+    def batch(self):
+        """
+        Group the input actions issued inside the block into one adb invocation.
+
+        Shell commands are queued instead of run, then sent together as a
+        single `&&`-chained shell command when the block exits, so a failing
+        action stops the rest. Nothing is sent if the block raises.
+
+        Example:
+            with touch_interface.batch():
+                touch_interface.touch((100, 200))
+                touch_interface.input_text("hello")
+        """
+        if self._batch is not None:
+            yield
+            return
+
+        self._batch = []
+        try:
+            yield
+            commands = self._batch
+        finally:
+            self._batch = None
+
+        if commands:
+            logger.debug(f"Running {len(commands)} batched commands")
+            self._run_adb_command(['shell', ' && '.join(commands)])
+
+    def set_input_method(self, method: str) -> None:
+        """
+        Choose how taps and swipes are injected.
+
+        Args:
+            method: "input" uses `input tap`/`input swipe`, which start a Java
+                process on the device per action; "sendevent" writes raw events
+                to the touch panel's /dev/input node, with the panel and its
+                coordinate scaling discovered from `getevent -pl` and `wm size`.
+                Falls back to "input" if no touch panel can be found. Text and
+                key events always use `input`.
+
+        Raises:
+            ValueError: If the method name is unknown
+        """
+        if method == "input":
+            self._touch_panel = None
+            return
+        if method != "sendevent":
+            raise ValueError(f"Unknown input method: {method}")
+
+        panel = parse_touch_panel(
+            self._run_adb_command(['shell', 'getevent', '-pl']),
+            self._run_adb_command(['shell', 'wm', 'size'])
+        )
+        if panel is None:
+            logger.warning("No multi-touch input device found, using 'input' for touches")
+        else:
+            logger.debug(f"Injecting touches via sendevent on {panel.device}")
+        self._touch_panel = panel
+
     def touch(self, coordinates: Union[Coordinates, Tuple[int, int]]) -> None:
         """
         Perform a single tap at specified coordinates.
@@ -152,7 +357,10 @@ class TouchInterface:
 
         coordinates.validate()
         logger.debug(f"Touching screen at coordinates ({coordinates.x}, {coordinates.y})")
-        self._run_adb_command(['shell', 'input', 'tap', str(coordinates.x), str(coordinates.y)])
+        if self._touch_panel is not None:
+            self._run_shell_command([self._touch_panel.tap_script(coordinates.x, coordinates.y)])
+            return
+        self._run_shell_command(['input', 'tap', str(coordinates.x), str(coordinates.y)])
 
     def swipe(
             self,
@@ -180,8 +388,11 @@ class TouchInterface:
             raise ValueError("Duration must be non-negative")
 
         logger.debug(f"Swiping from ({start.x}, {start.y}) to ({end.x}, {end.y})")
-        self._run_adb_command([
-            'shell', 'input', 'swipe',
+        if self._touch_panel is not None:
+            self._run_shell_command([self._touch_panel.swipe_script(start.x, start.y, end.x, end.y, duration_ms)])
+            return
+        self._run_shell_command([
+            'input', 'swipe',
             str(start.x), str(start.y),
             str(end.x), str(end.y),
             str(duration_ms)
@@ -191,11 +402,17 @@ class TouchInterface:
         """
         Enter text into the focused field.
 
+        Uses the fastest method that can type the payload correctly; see
+        text_input.TextEntryEngine.
+
         Args:
             text: Text to input
         """
         logger.debug(f"Inputting text: {text}")
-        self._run_adb_command(['shell', 'input', 'text', text])
+        if self._text_engine is None:
+            from text_input import TextEntryEngine
+            self._text_engine = TextEntryEngine(self)
+        self._text_engine.enter(text)
 
     def press_key(self, keycode: Union[AndroidKeyCode, int]) -> None:
         """
@@ -206,7 +423,7 @@ class TouchInterface:
         """
         keycode_value = int(keycode)
         logger.debug(f"Pressing key with keycode: {keycode_value}")
-        self._run_adb_command(['shell', 'input', 'keyevent', str(keycode_value)])
+        self._run_shell_command(['input', 'keyevent', str(keycode_value)])
 
     def dump_ui_hierarchy(self, output_path: str = "./") -> str:
         """
@@ -224,4 +441,327 @@ class TouchInterface:
         output_file = os.path.join(output_path, "window_dump.xml")
         self._run_adb_command(['pull', '/sdcard/window_dump.xml', output_file])
 
-        return output_file
\ No newline at end of file
+        return output_file
+
+    def get_window_focus(self) -> str:
+        """
+        Read the currently focused window and app from the window manager.
+
+        Much cheaper than a hierarchy dump, so it is suitable for polling
+        whether the screen is still transitioning.
+
+        Returns:
+            str: The `mCurrentFocus`/`mFocusedApp` lines of `dumpsys window`, or
+            an empty string if they are unavailable
+        """
+        try:
+            output = self._run_adb_command(
+                ['shell', 'dumpsys', 'window', '|', 'grep', '-E', "'mCurrentFocus|mFocusedApp'"]
+            )
+        except ADBError:
+            return ""
+        return " ".join(output.split())
+
+    def capture_ui_hierarchy(self) -> str:
+        """
+        Capture the current UI hierarchy and return the XML in memory.
+
+        Dumps straight to the command's output with `exec-out`, avoiding the
+        write to /sdcard, the pull and the host-side file read. Falls back to
+        `dump_ui_hierarchy` on devices that cannot dump to /dev/tty.
+
+        Returns:
+            str: UI hierarchy XML
+        """
+        logger.debug("Capturing UI hierarchy")
+        try:
+            output = self._run_adb_command(['exec-out', 'uiautomator', 'dump', '/dev/tty'])
+        except ADBError:
+            output = ""
+
+        start = output.find('<?xml')
+        end = output.rfind('>')
+        if start == -1 or end < start:
+            logger.debug("Streamed UI dump unavailable, falling back to file dump")
+            with open(self.dump_ui_hierarchy(), 'r') as f:
+                return f.read()
+
+        # uiautomator appends a status line ("UI hierchary dumped to: /dev/tty")
+        return output[start:end + 1]
+
+
+class AdbShellSession:
+    """
+    A long-lived `adb shell` process that executes commands streamed over stdin.
+
+    Each command is followed by an `echo` of a unique sentinel carrying the exit
+    status, so the output of a command is everything read from stdout until the
+    sentinel line appears. Output is drained by a background thread so reads can
+    time out on every platform (pipes are not selectable on Windows).
+
+    Attributes:
+        adb_path (str): Path to the ADB executable
+        device_id (Optional[str]): Specific device identifier for multi-device setups
+        timeout (float): Seconds to wait for a command to complete
+    """
+
+    def __init__(self, adb_path: str, device_id: Optional[str] = None, timeout: float = 30.0):
+        self.adb_path = adb_path
+        self.device_id = device_id
+        self.timeout = timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        """Whether the underlying shell process is still running"""
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """
+        Launch the `adb shell` process.
+
+        Raises:
+            ADBSessionError: If the process cannot be started
+        """
+        command = [self.adb_path]
+        if self.device_id:
+            command += ['-s', self.device_id]
+        command.append('shell')
+
+        try:
+            self._process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1
+            )
+        except OSError as e:
+            raise ADBSessionError(f"Failed to start ADB shell session: {e}")
+
+        self._lines = queue.Queue()
+        threading.Thread(target=self._drain_stdout, args=(self._process, self._lines), daemon=True).start()
+        logger.debug(f"Started ADB shell session (pid {self._process.pid})")
+
+    @staticmethod
+    def _drain_stdout(process: subprocess.Popen, lines: "queue.Queue[Optional[str]]") -> None:
+        """Forward stdout lines to the queue, with None marking end of stream"""
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)
+
+    def run(self, command: List[str]) -> str:
+        """
+        Execute a shell command in the session and return its output.
+
+        Args:
+            command: List of shell command components (without the leading 'shell')
+
+        Returns:
+            str: Command output
+
+        Raises:
+            ADBSessionError: If the command could not be sent to the session
+            ADBSessionInterrupted: If the command was sent but the session timed
+                out or closed before it reported an exit status
+            ADBError: If the command exits with a non-zero status
+        """
+        with self._lock:
+            if not self.alive:
+                self.start()
+
+            sentinel = f"__ADB_SESSION_{uuid.uuid4().hex}__"
+            try:
+                self._process.stdin.write(f"{' '.join(command)} 2>&1; echo \"{sentinel}$?\"\n")
+                self._process.stdin.flush()
+            except OSError as e:
+                self.close()
+                raise ADBSessionError(f"ADB shell session write failed: {e}")
+
+            output = []
+            while True:
+                try:
+                    line = self._lines.get(timeout=self.timeout)
+                except queue.Empty:
+                    self.close()
+                    raise ADBSessionInterrupted(f"ADB shell session timed out after {self.timeout}s")
+
+                if line is None:
+                    self.close()
+                    raise ADBSessionInterrupted("ADB shell session closed unexpectedly")
+
+                index = line.find(sentinel)
+                if index == -1:
+                    output.append(line)
+                    continue
+
+                output.append(line[:index])
+                status = line[index + len(sentinel):].strip()
+                break
+
+            result = "".join(output)
+            if status != "0":
+                logger.error(f"ADB command failed: {result}")
+                raise ADBError(f"ADB command failed: {result}")
+            return result
+
+    def close(self) -> None:
+        """Terminate the shell process if it is running"""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.terminate()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+
+
+class SessionTouchInterface(TouchInterface):
+    """
+    TouchInterface that routes shell commands through a persistent `adb shell` session.
+
+    Avoids spawning a new adb client process for every action. Commands other than
+    `shell` and `exec-out` (e.g. `devices`, `pull`) and any command issued while the session is broken use
+    the one-shot path of TouchInterface. A command the session failed after sending is not retried,
+    since a tap or text input that already ran would run twice; the session is restarted and the
+    error raised instead.
+
+    Attributes:
+        max_restarts (int): Number of times a broken session is restarted before
+            permanently falling back to one-shot commands
+    """
+
+    def __init__(self, device_id: Optional[str] = None, timeout: float = 30.0, max_restarts: int = 3):
+        """
+        Initialize the session-backed interface.
+
+        Args:
+            device_id: Optional device serial number for targeting a specific device
+            timeout: Seconds to wait for a single session command
+            max_restarts: Number of session restarts allowed before falling back for good
+        """
+        super().__init__(device_id=device_id)
+        self.max_restarts = max_restarts
+        self._restarts = 0
+        self._session: Optional[AdbShellSession] = AdbShellSession(self.adb_path, device_id, timeout)
+
+    def _run_adb_command(self, command: list) -> str:
+        """
+        Execute an ADB command, using the persistent session for shell commands.
+
+        Args:
+            command: List of command components
+
+        Returns:
+            str: Command output
+
+        Raises:
+            ADBSessionInterrupted: If the session failed after the command was sent
+            ADBError: If command execution fails
+        """
+        if self._session is None or len(command) < 2 or command[0] not in ('shell', 'exec-out'):
+            return super()._run_adb_command(command)
+
+        try:
+            return self._session.run(command[1:])
+        except ADBSessionInterrupted as e:
+            logger.warning(f"ADB shell session failed after sending a command ({e}); restarting it")
+            if self._count_restart(e):
+                try:
+                    self._session.start()
+                except ADBSessionError as start_error:
+                    logger.warning(f"Could not restart ADB shell session: {start_error}")
+            raise
+        except ADBSessionError as e:
+            if self._count_restart(e):
+                logger.warning(f"ADB shell session failed ({e}); falling back to one-shot command")
+            return super()._run_adb_command(command)
+
+    def _count_restart(self, error: ADBSessionError) -> bool:
+        """
+        Count a session failure, giving up on the session after `max_restarts`.
+
+        Returns:
+            bool: Whether the session should still be used
+        """
+        self._restarts += 1
+        if self._restarts > self.max_restarts:
+            logger.warning(f"ADB shell session failed ({error}); using one-shot commands from now on")
+            self._session = None
+            return False
+        return True
+
+    def close(self) -> None:
+        """Terminate the persistent shell session"""
+        if self._session is not None:
+            self._session.close()
+
+
+def list_devices(backend: str = "subprocess") -> List[str]:
+    """
+    List the serials of devices that are connected and ready.
+
+    Args:
+        backend: "socket" queries the adb server directly; any other backend
+            runs `adb devices`
+
+    Returns:
+        List of device serial numbers in the `device` state
+    """
+    if backend == "socket":
+        from adb_client import AdbClient
+        return [serial for serial, state in AdbClient().devices() if state == 'device']
+
+    adb_path = TouchInterface._get_adb_path()
+    try:
+        result = subprocess.run([adb_path, 'devices'], check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise ADBError(f"ADB command failed: {e.stderr}")
+
+    device_lines = result.stdout.split('\n')[1:]  # Skip first line (header)
+    return [
+        line.split('\t')[0] for line in device_lines
+        if line.strip() and line.split('\t')[-1].strip() == 'device'
+    ]
+
+
+def create_touch_interface(
+        backend: str = "subprocess",
+        device_id: Optional[str] = None,
+        input_method: str = "input"
+) -> TouchInterface:
+    """
+    Build a TouchInterface for the requested transport backend.
+
+    Args:
+        backend: One of "subprocess" (one adb process per command),
+            "session" (persistent adb shell) or "socket" (adb server protocol)
+        device_id: Optional device serial number for targeting a specific device
+        input_method: How touches are injected, "input" or "sendevent"
+
+    Returns:
+        TouchInterface: Interface using the requested backend
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    if backend == "subprocess":
+        interface = TouchInterface(device_id=device_id)
+    elif backend == "session":
+        interface = SessionTouchInterface(device_id=device_id)
+    elif backend == "socket":
+        from adb_client import SocketTouchInterface
+        interface = SocketTouchInterface(device_id=device_id)
+    else:
+        raise ValueError(f"Unknown ADB backend: {backend}")
+
+    interface.set_input_method(input_method)
+    return interface
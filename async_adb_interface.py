@@ -0,0 +1,255 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple, Union
+
+from adb_interface import ADBError, AndroidKeyCode, Coordinates
+from adb_client import (
+    DEFAULT_ADB_HOST, DEFAULT_ADB_PORT, check_status, encode_request, parse_length, parse_shell_output, server_error,
+    shell_request, transport_request
+)
+from text_input import input_text_commands
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTouchInterface:
+    """
+    Awaitable counterpart of TouchInterface built on asyncio streams.
+
+    Talks to the adb server's TCP protocol with non-blocking sockets, so a single
+    event loop can drive many devices concurrently without a thread or adb
+    process per command. Use `AsyncTouchInterface.create` to construct one.
+
+    Attributes:
+        device_id (Optional[str]): Specific device identifier for multi-device setups
+        host (str): adb server host
+        port (int): adb server port
+    """
+
+    def __init__(
+            self,
+            device_id: Optional[str] = None,
+            host: str = DEFAULT_ADB_HOST,
+            port: int = DEFAULT_ADB_PORT,
+            timeout: float = 30.0
+    ):
+        self.device_id = device_id
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    @classmethod
+    async def create(cls, device_id: Optional[str] = None, **kwargs) -> 'AsyncTouchInterface':
+        """
+        Create an interface and verify the device is connected.
+
+        Args:
+            device_id: Optional device serial number for targeting a specific device
+            **kwargs: host, port and timeout overrides
+
+        Raises:
+            ADBError: If no devices are connected or multiple devices without specified ID
+        """
+        interface = cls(device_id, **kwargs)
+        await interface._verify_device_connection()
+        return interface
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            return await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ADBError(f"Cannot connect to adb server at {self.host}:{self.port}: {e}")
+
+    @staticmethod
+    async def _close(writer: asyncio.StreamWriter) -> None:
+        """Close a connection and wait until its socket is released"""
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    @staticmethod
+    async def _read_length_prefixed(reader: asyncio.StreamReader) -> bytes:
+        """Read a payload prefixed by a 4 hex digit length"""
+        try:
+            return await reader.readexactly(parse_length(await reader.readexactly(4)))
+        except asyncio.IncompleteReadError:
+            raise ADBError("ADB server closed the connection")
+
+    @classmethod
+    async def _request(cls, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: str) -> None:
+        """Send a smart-socket request and check the OKAY/FAIL status"""
+        writer.write(encode_request(request))
+        await writer.drain()
+        try:
+            status = await reader.readexactly(4)
+        except asyncio.IncompleteReadError:
+            raise ADBError("ADB server closed the connection")
+        if not check_status(status):
+            raise server_error(await cls._read_length_prefixed(reader))
+
+    async def _verify_device_connection(self) -> None:
+        """
+        Verify ADB device connection status.
+
+        Raises:
+            ADBError: If no devices are connected or multiple devices without specified ID
+        """
+        connected_devices = [serial for serial, _ in await self.devices()]
+
+        if not connected_devices:
+            raise ADBError("No devices connected")
+
+        if len(connected_devices) > 1 and not self.device_id:
+            raise ADBError("Multiple devices connected. Please specify device_id")
+
+        if self.device_id and self.device_id not in connected_devices:
+            raise ADBError(f"Specified device {self.device_id} not found")
+
+    async def devices(self) -> List[Tuple[str, str]]:
+        """
+        List devices known to the adb server.
+
+        Returns:
+            List of (serial, state) tuples
+        """
+        reader, writer = await self._open()
+        try:
+            await self._request(reader, writer, "host:devices")
+            listing = (await self._read_length_prefixed(reader)).decode('utf-8')
+        finally:
+            await self._close(writer)
+        return [tuple(line.split('\t')[:2]) for line in listing.splitlines() if line.strip()]
+
+    async def _run_service(self, service: str) -> bytes:
+        """Run a device service and return everything it writes before closing"""
+        reader, writer = await self._open()
+        try:
+            await self._request(reader, writer, transport_request(self.device_id))
+            await self._request(reader, writer, service)
+            return await asyncio.wait_for(reader.read(), self.timeout)
+        except asyncio.TimeoutError:
+            raise ADBError(f"ADB command timed out after {self.timeout}s: {service}")
+        finally:
+            await self._close(writer)
+
+    async def shell(self, command: List[str]) -> str:
+        """
+        Execute a shell command on the device and return its output.
+
+        Args:
+            command: List of shell command components
+
+        Raises:
+            ADBError: If the command exits with a non-zero status
+        """
+        service, sentinel = shell_request(" ".join(command))
+        output = (await self._run_service(service)).decode('utf-8', 'replace')
+        return parse_shell_output(output, sentinel)
+
+    async def touch(self, coordinates: Union[Coordinates, Tuple[int, int]]) -> None:
+        """
+        Perform a single tap at specified coordinates.
+
+        Args:
+            coordinates: Either a Coordinates object or tuple of (x, y) coordinates
+        """
+        if isinstance(coordinates, tuple):
+            coordinates = Coordinates(*coordinates)
+
+        coordinates.validate()
+        logger.debug(f"Touching screen at coordinates ({coordinates.x}, {coordinates.y})")
+        await self.shell(['input', 'tap', str(coordinates.x), str(coordinates.y)])
+
+    async def swipe(
+            self,
+            start: Union[Coordinates, Tuple[int, int]],
+            end: Union[Coordinates, Tuple[int, int]],
+            duration_ms: int = 300
+    ) -> None:
+        """
+        Perform a swipe gesture from start to end coordinates.
+
+        Args:
+            start: Starting coordinates
+            end: Ending coordinates
+            duration_ms: Duration of swipe in milliseconds
+        """
+        if isinstance(start, tuple):
+            start = Coordinates(*start)
+        if isinstance(end, tuple):
+            end = Coordinates(*end)
+
+        start.validate()
+        end.validate()
+
+        if duration_ms < 0:
+            raise ValueError("Duration must be non-negative")
+
+        logger.debug(f"Swiping from ({start.x}, {start.y}) to ({end.x}, {end.y})")
+        await self.shell([
+            'input', 'swipe',
+            str(start.x), str(start.y),
+            str(end.x), str(end.y),
+            str(duration_ms)
+        ])
+
+    async def input_text(self, text: str) -> None:
+        """
+        Enter text into the focused field.
+
+        Escaped and chunked like TouchInterface.input_text, so spaces survive
+        and shell metacharacters are typed rather than run on the device.
+
+        Args:
+            text: Text to input
+        """
+        logger.debug(f"Inputting text: {text}")
+        if not text:
+            return
+        await self.shell([" && ".join(input_text_commands(text))])
+
+    async def press_key(self, keycode: Union[AndroidKeyCode, int]) -> None:
+        """
+        Simulate a keypress event.
+
+        Args:
+            keycode: Either an AndroidKeyCode enum value or integer keycode
+        """
+        keycode_value = int(keycode)
+        logger.debug(f"Pressing key with keycode: {keycode_value}")
+        await self.shell(['input', 'keyevent', str(keycode_value)])
+
+    async def get_window_focus(self) -> str:
+        """
+        Read the currently focused window and app from the window manager.
+
+        Returns:
+            str: The `mCurrentFocus`/`mFocusedApp` lines of `dumpsys window`, or
+            an empty string if they are unavailable
+        """
+        try:
+            output = await self.shell(['dumpsys', 'window', '|', 'grep', '-E', "'mCurrentFocus|mFocusedApp'"])
+        except ADBError:
+            return ""
+        return " ".join(output.split())
+
+    async def dump_ui_hierarchy(self) -> str:
+        """
+        Capture the current UI hierarchy and return the XML in memory.
+
+        Returns:
+            str: UI hierarchy XML
+
+        Raises:
+            ADBError: If the dump does not contain a hierarchy
+        """
+        logger.debug("Capturing UI hierarchy")
+        output = (await self._run_service("exec:uiautomator dump /dev/tty")).decode('utf-8', 'replace')
+
+        start = output.find('<?xml')
+        end = output.rfind('>')
+        if start == -1 or end < start:
+            raise ADBError(f"UI hierarchy dump failed: {output.strip()}")
+        return output[start:end + 1]
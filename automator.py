@@ -1,13 +1,26 @@
 import os
 import json
 import logging
+import time
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple, Union
 from enum import Enum
 from pathlib import Path
 import yaml
 from ollama import Client, ChatResponse
-from adb_interface import TouchInterface, Coordinates, AndroidKeyCode, ADBError
+from adb_interface import TouchInterface, Coordinates, AndroidKeyCode, ADBError, create_touch_interface
+from ui_tree import ELEMENT_ID_PROMPT, ElementIndex, Verbosity, format_screen
+from node_table import NodeTable, parse_node_table
+from ui_diff import DIFF_PROMPT, ScreenDiffer
+from history import HistoryManager, estimate_tokens
+from command_cache import CommandCache, cache_key
+from json_stream import JSONObjectScanner
+from settle import SettleDetector
+from inference_broker import InferenceBroker
+from telemetry import Telemetry
+from metrics import AutomatorMetrics, start_metrics_server
+from replay import CommandTrace, TraceStore
 
 
 def setup_logging(level=logging.INFO):
@@ -32,7 +45,7 @@ def setup_logging(level=logging.INFO):
     )
     app_logger.addHandler(handler)
 
-    modules = ['adb_interface', 'automator']
+    modules = ['adb_interface', 'adb_client', 'ui_tree', 'node_table', 'ui_diff', 'history', 'command_cache', 'json_stream', 'settle', 'pipeline', 'runner', 'inference_broker', 'async_adb_interface', 'text_input', 'telemetry', 'metrics', 'replay', 'automator']
     for module in modules:
         module_logger = logging.getLogger(module)
         module_logger.setLevel(level)
@@ -47,11 +60,65 @@ logger = setup_logging()
 class CommandType(Enum):
     """Supported automation command types"""
     TOUCH = "touch"
+    TAP = "tap"
     SWIPE = "swipe"
     TEXT = "text"
     KEY = "key"
     END = "end"
     ERROR = "error"
+    BATCH = "batch"
+
+
+# Patterns of the single actions the LLM may send, used to constrain its output
+ACTION_PATTERNS = {
+    CommandType.TOUCH: r"touch \d{1,5} \d{1,5}",
+    CommandType.TAP: r"tap #?\d{1,4}",
+    CommandType.SWIPE: r"swipe \d{1,5} \d{1,5} \d{1,5} \d{1,5} \d{1,6}",
+    CommandType.TEXT: r"text .+",
+    CommandType.KEY: r"key \d{1,3}",
+}
+LLM_FORMATS = ("schema", "json")
+
+# Sent after an unusable reply, in place of the history
+REPAIR_PROMPT = (
+    "Your last reply could not be used: {error}\n"
+    "Reply again with one valid command for the screen above, as a JSON object such as "
+    "{{\"command\":\"touch 120 340\"}}, and nothing else."
+)
+
+
+def command_schema(element_ids: bool = False) -> Dict:
+    """
+    JSON schema of the command object, for Ollama's structured outputs.
+
+    Decoding under the schema can only produce `{"command": ...}` holding one
+    action, "end", "error" or a non-empty list of actions, each matching its
+    keyword's argument pattern, so the reply needs no cleanup before parsing.
+
+    Args:
+        element_ids: Whether "tap <id>" is allowed
+
+    Returns:
+        Dict: Schema to pass as the `format` of a chat request
+    """
+    actions = "|".join(
+        pattern for command_type, pattern in ACTION_PATTERNS.items()
+        if element_ids or command_type != CommandType.TAP
+    )
+    action = {'type': 'string', 'pattern': f"^({actions})$"}
+    return {
+        'type': 'object',
+        'properties': {
+            'command': {
+                'anyOf': [
+                    action,
+                    {'type': 'string', 'enum': [CommandType.END.value, CommandType.ERROR.value]},
+                    {'type': 'array', 'items': action, 'minItems': 1}
+                ]
+            }
+        },
+        'required': ['command']
+    }
 
 
 @dataclass
@@ -61,6 +128,35 @@ class AutomatorConfig:
     llm_model: str
     ollama_host: str
     device_id: Optional[str] = None
+    adb_backend: str = "subprocess"
+    input_method: str = "input"
+    settle_mode: str = "off"
+    settle_timeout: float = 3.0
+    settle_poll_interval: float = 0.1
+    ui_format: str = "compact"
+    ui_verbosity: int = Verbosity.NORMAL
+    ui_diff: bool = False
+    ui_diff_threshold: float = 0.4
+    element_ids: bool = False
+    history_screens: int = 3
+    history_token_budget: int = 6000
+    ollama_keep_alive: str = "30m"
+    llm_stream: bool = True
+    llm_format: Optional[str] = "schema"
+    repair_attempts: int = 2
+    repair_backoff: float = 0.0
+    pipeline: bool = False
+    max_steps: int = 0
+    llm_parallelism: Optional[int] = None
+    command_cache_size: int = 256
+    command_cache_file: Optional[str] = None
+    command_cache_context: int = 2
+    telemetry: bool = False
+    telemetry_file: Optional[str] = None
+    metrics_port: Optional[int] = None
+    metrics_host: str = "127.0.0.1"
+    trace_file: Optional[str] = None
+    trace_mode: str = "record"
 
     @classmethod
     def from_yaml(cls, config_path: str) -> 'AutomatorConfig':
@@ -74,8 +170,27 @@ class AutomationCommand:
     """Represents a parsed automation command with validation"""
 
     def __init__(self, command_json: Dict):
-        self.raw_command = command_json.get('command', '')
-        self.parse_command()
+        command = command_json.get('command', '')
+        self.sub_commands: List['AutomationCommand'] = []
+
+        if isinstance(command, list) and len(command) == 1:
+            command = command[0]
+
+        if isinstance(command, list):
+            if not command:
+                raise ValueError("Empty command received")
+            if not all(isinstance(part, str) for part in command):
+                raise ValueError("A list of commands may only contain command strings")
+            self.sub_commands = [AutomationCommand({'command': part}) for part in command]
+            self.raw_command = "; ".join(part.raw_command for part in self.sub_commands)
+            self.command_type = CommandType.BATCH
+            self.args = []
+            self.text = ""
+        elif isinstance(command, str):
+            self.raw_command = command
+            self.parse_command()
+        else:
+            raise ValueError("The command must be a string or a list of strings")
 
     def parse_command(self) -> None:
         """Parse the raw command string into components"""
@@ -83,20 +198,48 @@ class AutomationCommand:
         if not parts:
             raise ValueError("Empty command received")
 
-        self.command_type = CommandType(parts[0])
+        try:
+            self.command_type = CommandType(parts[0])
+        except ValueError:
+            raise ValueError(f"Unknown command keyword: {parts[0]}")
         self.args = parts[1:]
+        # Text is taken verbatim after the keyword so repeated whitespace survives
+        self.text = self.raw_command.lstrip()[len(parts[0]) + 1:]
+
+    @property
+    def is_terminal(self) -> bool:
+        """Whether the command ends the automation run"""
+        return self.command_type in (CommandType.END, CommandType.ERROR)
 
     def validate(self) -> None:
         """Validate command arguments"""
         if self.command_type in (CommandType.END, CommandType.ERROR):
             return
 
+        if self.command_type == CommandType.BATCH:
+            if not self.sub_commands:
+                raise ValueError("Batch command requires a list of commands")
+            for sub_command in self.sub_commands:
+                if sub_command.is_terminal:
+                    raise ValueError("End and error commands must be sent on their own")
+                sub_command.validate()
+
         if self.command_type == CommandType.TOUCH:
             if len(self.args) != 2:
                 raise ValueError("Touch command requires X and Y coordinates")
             x, y = map(int, self.args)
             Coordinates(x, y).validate()
 
+        elif self.command_type == CommandType.TAP:
+            if len(self.args) != 1:
+                raise ValueError("Tap command requires exactly one element id")
+            try:
+                element_id = int(self.args[0].lstrip('#'))
+            except ValueError:
+                raise ValueError("Invalid element id")
+            if element_id < 1:
+                raise ValueError("Element ids start at 1")
+
         elif self.command_type == CommandType.SWIPE:
             if len(self.args) != 5:
                 raise ValueError("Swipe command requires start X,Y, end X,Y, and duration")
@@ -131,13 +274,68 @@ class Automator:
             config: AutomatorConfig object containing settings
         """
         self.config = config
-        self.touch_interface = TouchInterface(device_id=config.device_id)
+        self.touch_interface = create_touch_interface(
+            backend=config.adb_backend,
+            device_id=config.device_id,
+            input_method=config.input_method
+        )
+        self.settle_detector: Optional[SettleDetector] = None
+        if config.settle_mode != "off":
+            self.settle_detector = SettleDetector(
+                self.touch_interface,
+                mode=config.settle_mode,
+                poll_interval=config.settle_poll_interval,
+                timeout=config.settle_timeout
+            )
+        self.inference_broker: Optional[InferenceBroker] = None
         self.llm_client = Client(
             host=config.ollama_host,
             timeout=300
         )
-        self.messages: List[Dict] = []
+        self.history = HistoryManager(
+            max_screens=config.history_screens,
+            token_budget=config.history_token_budget
+        )
+        self.screen_differ: Optional[ScreenDiffer] = None
+        if config.ui_diff and config.ui_format == "compact":
+            # A full snapshot must stay among the screens the history sends verbatim
+            self.screen_differ = ScreenDiffer(
+                threshold=config.ui_diff_threshold,
+                max_deltas=max(0, config.history_screens)
+            )
+        self.element_index: Optional[ElementIndex] = None
+        if config.element_ids and config.ui_format == "compact":
+            self.element_index = ElementIndex()
+        if config.llm_format is not None and config.llm_format not in LLM_FORMATS:
+            raise ValueError(f"Unknown llm_format: {config.llm_format}")
+        # Ollama accepts "json" for any JSON object, or a schema
+        self.llm_format: Optional[Union[str, Dict]] = config.llm_format
+        if config.llm_format == "schema":
+            self.llm_format = command_schema(element_ids=self.element_index is not None)
+        self.command_cache: Optional[CommandCache] = None
+        if config.command_cache_size > 0:
+            self.command_cache = CommandCache(
+                max_entries=config.command_cache_size,
+                path=config.command_cache_file
+            )
+        self.telemetry: Optional[Telemetry] = None
+        if config.telemetry or config.telemetry_file:
+            self.telemetry = Telemetry(config.telemetry_file, device=config.device_id)
+            self.telemetry.instrument(self.touch_interface)
+        self.metrics: Optional[AutomatorMetrics] = None
+        if config.metrics_port is not None:
+            start_metrics_server(config.metrics_port, config.metrics_host)
+            self.metrics = AutomatorMetrics(config.device_id)
+            self.metrics.instrument(self.touch_interface)
+        self.trace: Optional[CommandTrace] = None
+        if config.trace_file:
+            self.trace = CommandTrace(TraceStore(config.trace_file), config.trace_mode)
         self.system_prompt = self._load_prompt()
+        self._system_message: Optional[Dict] = None
+        self._previous_fingerprint: Optional[str] = None
+        self._cache_keys_used: Set[str] = set()
+        self._replayed_key: Optional[str] = None
+        self.steps = 0
 
     def _load_prompt(self) -> str:
         """Load the system prompt from file"""
@@ -147,52 +345,393 @@ class Automator:
         except FileNotFoundError:
             raise FileNotFoundError(f"Prompt file not found: {self.config.prompt_file}")
 
+    def close(self) -> None:
+        """Release device connections, persist the command cache and report telemetry"""
+        self.touch_interface.close()
+        if self.command_cache is not None:
+            self.command_cache.save()
+        if self.telemetry is not None:
+            self.telemetry.close()
+
+    def start_run(self, user_prompt: str) -> None:
+        """Reset per-run state before the first step of a tester prompt"""
+        self.history.clear()
+        if self.screen_differ is not None:
+            self.screen_differ.reset()
+        self._previous_fingerprint = None
+        self._cache_keys_used.clear()
+        self._replayed_key = None
+        self.steps = 0
+        if self.trace is not None:
+            self.trace.begin(user_prompt)
+
+    def finish_run(self) -> None:
+        """Save the run's command trace once it has ended normally"""
+        if self.trace is not None:
+            self.trace.finish()
+
+    def _measure(self, stage: str):
+        """Time the enclosed block as `stage` of the current step when telemetry is enabled"""
+        if self.telemetry is None:
+            return nullcontext()
+        return self.telemetry.measure(stage)
+
     def get_ui_hierarchy(self) -> str:
-        """Capture current UI hierarchy"""
+        """Capture current UI hierarchy, waiting for the screen to settle if enabled"""
         try:
-            self.touch_interface.dump_ui_hierarchy()
-            with open('window_dump.xml', 'r') as f:
-                return f.read()
+            with self._measure("capture"):
+                if self.settle_detector is not None:
+                    ui_hierarchy = self.settle_detector.capture()
+                else:
+                    ui_hierarchy = self.touch_interface.capture_ui_hierarchy()
         except (ADBError, FileNotFoundError) as e:
             logger.error(f"Failed to get UI hierarchy: {e}")
             raise
 
-    def query_llm(self, ui_hierarchy: str, user_prompt: str) -> AutomationCommand:
+        if self.telemetry is not None:
+            self.telemetry.current.xml_bytes = len(ui_hierarchy.encode('utf-8'))
+        return ui_hierarchy
+
+    def describe_screen(self, ui_hierarchy: str, table: Optional[NodeTable] = None) -> str:
         """
-        Query the LLM for next action based on UI state.
+        Render the UI hierarchy in the format sent to the LLM.
 
         Args:
             ui_hierarchy: Current UI hierarchy XML
+            table: Already parsed hierarchy, to avoid parsing it again
+
+        Returns:
+            str: Raw XML or compact screen description, per `config.ui_format`.
+            With `config.ui_diff`, small changes from the previous screen are
+            described as a delta instead. With `config.element_ids`, actionable
+            elements are numbered and the element index is updated to match
+        """
+        if self.config.ui_format == "xml":
+            return ui_hierarchy
+        if table is None:
+            table = parse_node_table(ui_hierarchy)
+        elements = table.compact_elements(Verbosity(self.config.ui_verbosity), self.element_index is not None)
+        if self.element_index is not None:
+            self.element_index.update(elements)
+        if self.screen_differ is not None:
+            return self.screen_differ.describe(elements, table.screen_package(), table.screen_title)
+        return format_screen(table.screen_package(), elements)
+
+    def build_system_message(self, user_prompt: str) -> Dict:
+        """
+        Build the system message holding the system and tester prompts.
+
+        The message is built once per tester prompt and reused verbatim, so the
+        start of every request is identical and Ollama can reuse its KV cache for
+        it. Starting a new tester prompt also starts a fresh history.
+
+        Args:
             user_prompt: User's test condition
 
         Returns:
-            AutomationCommand object representing next action
+            Dict: Chat message with the `system` role
         """
-        prompt = f"{self.system_prompt}{user_prompt}\n###END TESTER PROMPT###"
+        content = f"{self.system_prompt}{user_prompt}\n###END TESTER PROMPT###"
+        if self.element_index is not None:
+            content += ELEMENT_ID_PROMPT
+        if self.screen_differ is not None:
+            content += DIFF_PROMPT
+        if self._system_message is None or self._system_message['content'] != content:
+            self._system_message = {'role': 'system', 'content': content}
+            self.history.clear()
+            if self.screen_differ is not None:
+                self.screen_differ.reset()
+        return self._system_message
+
+    def _chat(self, messages: List[Dict]) -> str:
+        """
+        Send messages to the LLM, through the shared inference broker if one is set.
 
-        try:
+        Args:
+            messages: Chat messages to send
+
+        Returns:
+            str: The command JSON text (or the raw reply if none was found)
+        """
+        if self.inference_broker is not None:
+            return self.inference_broker.run(self._send_chat, messages)
+        return self._send_chat(messages)
+
+    def _send_chat(self, messages: List[Dict]) -> str:
+        """
+        Send messages to the LLM and return the text of its command.
+
+        With `config.llm_format` set, Ollama constrains decoding to the
+        command schema (or to any JSON object), so the reply is the command
+        object alone and generation ends at its closing brace; a stream is then
+        read through to Ollama's final chunk, which carries the evaluation
+        statistics and leaves the connection reusable. Without a format,
+        a stream is aborted as soon as the first complete JSON object has
+        arrived, so trailing whitespace, end-of-message tokens or chatter
+        never delay the command.
+
+        Args:
+            messages: Chat messages to send
+
+        Returns:
+            str: The command JSON text (or the raw reply if none was found)
+        """
+        if not self.config.llm_stream:
             response: ChatResponse = self.llm_client.chat(
                 model=self.config.llm_model,
-                messages=self.messages + [
-                    {'role': 'user', 'content': ui_hierarchy},
-                    {'role': 'user', 'content': prompt}
-                ]
+                messages=messages,
+                format=self.llm_format,
+                keep_alive=self.config.ollama_keep_alive
             )
+            if self.telemetry is not None:
+                self.telemetry.record_llm_response(response)
+            if self.llm_format is not None:
+                return response['message']['content']
+            return response['message']['content'].replace("<|eom_id|>", "")
+
+        stream = self.llm_client.chat(
+            model=self.config.llm_model,
+            messages=messages,
+            format=self.llm_format,
+            keep_alive=self.config.ollama_keep_alive,
+            stream=True
+        )
+        scanner = JSONObjectScanner()
+        started = time.perf_counter()
+        chunks = 0
+        command_text = None
+        try:
+            for chunk in stream:
+                chunks += 1
+                if self.telemetry is not None:
+                    if chunks == 1:
+                        self.telemetry.current.first_token_s = time.perf_counter() - started
+                    self.telemetry.current.eval_count = chunks
+                    if chunk.get('done'):
+                        self.telemetry.record_llm_response(chunk)
+                if command_text is None:
+                    command_text = scanner.feed(chunk['message']['content'])
+                    # Constrained generation stops at the brace anyway, so only cut free-form output short
+                    if command_text is not None and self.llm_format is None:
+                        return command_text
+        finally:
+            # Closing the stream drops the HTTP connection, which stops generation
+            stream.close()
+        if command_text is not None:
+            return command_text
+        return scanner.text.replace("<|eom_id|>", "")
+
+    def prefill_llm(self, user_prompt: str) -> None:
+        """
+        Have Ollama evaluate the known part of the next request ahead of time.
 
-            content = response['message']['content'].replace("<|eom_id|>", "")
+        Sends the system message and current history with a one-token generation
+        limit. The evaluated prefix stays in Ollama's KV cache, so the real query
+        only has to process the new screen. Used by the pipelined loop while the
+        next screen is being captured.
+
+        Args:
+            user_prompt: User's test condition
+        """
+        if self.trace is not None and self.trace.replaying:
+            # The next step will most likely come from the trace
+            return
+        messages = [self.build_system_message(user_prompt)] + self.history.build_messages()
+        request = lambda: self.llm_client.chat(
+            model=self.config.llm_model,
+            messages=messages,
+            keep_alive=self.config.ollama_keep_alive,
+            options={'num_predict': 1}
+        )
+        try:
+            if self.inference_broker is not None:
+                self.inference_broker.run(request)
+            else:
+                request()
+        except Exception as e:
+            logger.debug(f"LLM prefill failed: {e}")
+
+    def query_llm(self, ui_hierarchy: str, user_prompt: str) -> AutomationCommand:
+        """
+        Query the LLM for next action based on UI state.
+
+        Args:
+            ui_hierarchy: Current UI hierarchy XML
+            user_prompt: User's test condition
+
+        Returns:
+            AutomationCommand object representing next action
+        """
+        with self._measure("query") as step:
+            system_message = self.build_system_message(user_prompt)
+            table = parse_node_table(ui_hierarchy)
+            screen = self.describe_screen(ui_hierarchy, table)
+
+            fingerprint = table.fingerprint()
+
+            # The newest action in the cache key has no outcome yet, so after an action that left
+            # the screen as it was the key would repeat and replay that action forever
+            screen_unchanged = fingerprint == self._previous_fingerprint
+            self._previous_fingerprint = fingerprint
+            if screen_unchanged and self._replayed_key is not None:
+                # A cached command that did nothing would mislead later runs too
+                logger.info("Cached command left the screen unchanged, evicting it")
+                self.command_cache.discard(self._replayed_key)
+            self._replayed_key = None
+
+            key = None
+            content = None
+            if self.trace is not None:
+                content = self.trace.lookup(fingerprint)
+            if content is None and self.command_cache is not None and not screen_unchanged:
+                key = cache_key(
+                    fingerprint,
+                    user_prompt,
+                    self.history.recent_actions(self.config.command_cache_context)
+                )
+                # A key seen before in this run means the run has come back round a cycle of
+                # screens; replaying would repeat the cycle forever, so let the LLM see the history
+                if key not in self._cache_keys_used:
+                    content = self.command_cache.get(key)
+                    if self.metrics is not None:
+                        self.metrics.record_cache_lookup(content is not None)
+                self._cache_keys_used.add(key)
+
+            command = None
+            try:
+                if content is None:
+                    history_messages = self.history.build_messages()
+                    messages = [system_message] + history_messages + [{'role': 'user', 'content': screen}]
+                    history_tokens = sum(estimate_tokens(message['content']) for message in history_messages)
+                    if step is not None:
+                        step.screen_tokens = estimate_tokens(screen)
+                        step.history_tokens = history_tokens
+                        step.prompt_tokens = sum(estimate_tokens(message['content']) for message in messages)
+                    started = time.perf_counter()
+                    with self._measure("inference"):
+                        content = self._chat(messages)
+                    if self.metrics is not None:
+                        self.metrics.record_llm_request(time.perf_counter() - started)
+                        self.metrics.record_history_tokens(history_tokens)
+                    logger.info(f"Response from LLM: {content}")
+                elif key is not None:
+                    logger.info(f"Command cache hit, reusing: {content}")
+                    self._replayed_key = key
+                    if step is not None:
+                        step.cache_hit = True
+
+                command, content = self._parse_or_repair(content, system_message, screen, table)
+                if key is not None and command.command_type != CommandType.ERROR:
+                    self.command_cache.put(key, content)
+                self.history.record(screen, content, command.raw_command, table, self.element_index, fingerprint)
+                if self.trace is not None:
+                    self.trace.record(fingerprint, content, table.screen_title())
+
+                if step is not None:
+                    step.history_steps = len(self.history)
+
+            except Exception as e:
+                logger.error(f"LLM query failed: {e}")
+                if self.metrics is not None:
+                    self.metrics.record_failure("invalid" if command is None else command.command_type.value)
+                if self.telemetry is not None:
+                    self.telemetry.end_step(error=str(e))
+                raise
+
+        if self.metrics is not None and command.command_type == CommandType.ERROR:
+            self.metrics.record_failure(CommandType.ERROR.value)
+        if command.is_terminal and self.telemetry is not None:
+            self.telemetry.end_step(command.raw_command)
+        return command
+
+    def _parse_command(self, content: str) -> AutomationCommand:
+        """
+        Parse an LLM reply into a command that is ready to execute.
+
+        Raises:
+            ValueError: If the reply is not JSON, names an unknown command,
+                has invalid arguments or taps an id missing from the screen
+        """
+        try:
             command_json = json.loads(content)
-            logger.info(f"Response from LLM: {content}")
+        except json.JSONDecodeError:
+            raise ValueError("the reply is not valid JSON")
+        if not isinstance(command_json, dict) or 'command' not in command_json:
+            raise ValueError('the reply must be a JSON object with a "command" key')
+        command = AutomationCommand(command_json)
+        command.validate()
+        for part in command.sub_commands or [command]:
+            if part.command_type == CommandType.TAP:
+                self._tap_target(part)
+        return command
+
+    def _parse_or_repair(self, content: str, system_message: Dict, screen: str,
+                         table: NodeTable) -> Tuple[AutomationCommand, str]:
+        """
+        Parse a reply, asking the LLM to correct it while it stays unusable.
 
-            self.messages.extend([
-                {'role': 'assistant', 'content': content},
-                {'role': 'user', 'content': ui_hierarchy}
-            ])
+        Each repair request carries only the system message, the current
+        screen, the rejected reply and the error, not the history, so it is
+        short and its prefix is already in Ollama's cache. Up to
+        `config.repair_attempts` repairs are made, waiting `config.repair_backoff`
+        seconds before the first and twice as long before each further one.
 
-            return AutomationCommand(command_json)
+        Args:
+            content: Reply to parse
+            system_message: System message of the current tester prompt
+            screen: Screen description the reply was given for
+            table: Parsed hierarchy of the screen
 
-        except Exception as e:
-            logger.error(f"LLM query failed: {e}")
-            raise
+        Returns:
+            The command and the reply it was parsed from
+
+        Raises:
+            ValueError: If the reply is still unusable after the last repair
+        """
+        attempt = 0
+        while True:
+            try:
+                command = self._parse_command(content)
+            except ValueError as e:
+                if attempt >= self.config.repair_attempts:
+                    if self.metrics is not None and attempt:
+                        self.metrics.record_repair(False)
+                    raise
+                attempt += 1
+                logger.warning(f"Invalid command {content!r}: {e}. Asking for a correction ({attempt}/"
+                               f"{self.config.repair_attempts})")
+                if self.config.repair_backoff > 0:
+                    time.sleep(self.config.repair_backoff * 2 ** (attempt - 1))
+                content = self._repair(content, str(e), system_message, screen, table)
+                if self.telemetry is not None:
+                    self.telemetry.current.repairs = attempt
+                continue
+
+            if attempt:
+                logger.info(f"Command repaired after {attempt} attempt(s): {content}")
+                if self.metrics is not None:
+                    self.metrics.record_repair(True)
+            return command, content
+
+    def _repair(self, reply: str, error: str, system_message: Dict, screen: str, table: NodeTable) -> str:
+        """Send one repair request and return the new reply"""
+        if self.screen_differ is not None:
+            # A delta only makes sense next to the history, so describe the whole screen
+            elements = table.compact_elements(Verbosity(self.config.ui_verbosity), self.element_index is not None)
+            screen = format_screen(table.screen_package(), elements)
+        messages = [
+            system_message,
+            {'role': 'user', 'content': screen},
+            {'role': 'assistant', 'content': reply},
+            {'role': 'user', 'content': REPAIR_PROMPT.format(error=error)}
+        ]
+        started = time.perf_counter()
+        with self._measure("inference"):
+            content = self._chat(messages)
+        if self.metrics is not None:
+            self.metrics.record_llm_request(time.perf_counter() - started)
+        logger.info(f"Repaired response from LLM: {content}")
+        return content
 
     def execute_command(self, command: AutomationCommand) -> None:
         """
@@ -201,34 +740,104 @@ class Automator:
         Args:
             command: AutomationCommand to execute
         """
+        error = None
         try:
-            command.validate()
-
-            if command.command_type == CommandType.TOUCH:
-                x, y = map(int, command.args)
-                self.touch_interface.touch(Coordinates(x, y))
-
-            elif command.command_type == CommandType.SWIPE:
-                x1, y1, x2, y2, duration = map(int, command.args)
-                self.touch_interface.swipe(
-                    Coordinates(x1, y1),
-                    Coordinates(x2, y2),
-                    duration
-                )
-
-            elif command.command_type == CommandType.TEXT:
-                self.touch_interface.input_text(" ".join(command.args))
-
-            elif command.command_type == CommandType.KEY:
-                self.touch_interface.press_key(int(command.args[0]))
+            with self._measure("execute"):
+                command.validate()
+                # Resolve every element id before anything is sent, so a bad id in a batch sends nothing
+                for part in command.sub_commands or [command]:
+                    if part.command_type == CommandType.TAP:
+                        self._tap_target(part)
+
+                if command.command_type == CommandType.BATCH:
+                    # Send every action of the batch to the device in one adb invocation
+                    with self.touch_interface.batch():
+                        for sub_command in command.sub_commands:
+                            self._dispatch(sub_command)
+                else:
+                    self._dispatch(command)
 
         except Exception as e:
             logger.error(f"Command execution failed: {e}")
+            error = str(e)
+            if self.metrics is not None:
+                self.metrics.record_failure(command.command_type.value)
             raise
+        else:
+            if self.metrics is not None:
+                self.metrics.record_step()
+        finally:
+            if self.telemetry is not None:
+                self.telemetry.end_step(command.raw_command, error)
+
+    def _tap_target(self, command: AutomationCommand) -> Coordinates:
+        """Coordinates of the element a tap command refers to on the current screen"""
+        if self.element_index is None:
+            raise ValueError("Tap commands need element_ids enabled with the compact ui_format")
+        x, y = self.element_index.center(int(command.args[0].lstrip('#')))
+        return Coordinates(x, y)
+
+    def _dispatch(self, command: AutomationCommand) -> None:
+        """Issue a single validated command to the touch interface"""
+        if command.command_type == CommandType.TOUCH:
+            x, y = map(int, command.args)
+            self.touch_interface.touch(Coordinates(x, y))
+
+        elif command.command_type == CommandType.TAP:
+            self.touch_interface.touch(self._tap_target(command))
+
+        elif command.command_type == CommandType.SWIPE:
+            x1, y1, x2, y2, duration = map(int, command.args)
+            self.touch_interface.swipe(
+                Coordinates(x1, y1),
+                Coordinates(x2, y2),
+                duration
+            )
+
+        elif command.command_type == CommandType.TEXT:
+            self.touch_interface.input_text(command.text)
+
+        elif command.command_type == CommandType.KEY:
+            self.touch_interface.press_key(int(command.args[0]))
+
+    def run(self, user_prompt: str) -> Optional[AutomationCommand]:
+        """
+        Run the capture/query/execute loop until the LLM ends the test.
+
+        Args:
+            user_prompt: User's test condition
+
+        Returns:
+            The terminal END or ERROR command, or None if `config.max_steps`
+            was reached first
+        """
+        self.start_run(user_prompt)
+        while not self.config.max_steps or self.steps < self.config.max_steps:
+            logger.debug("Processing next automation cycle")
+            # Get current UI state
+            ui_hierarchy = self.get_ui_hierarchy()
+
+            # Get next command from LLM
+            command = self.query_llm(ui_hierarchy, user_prompt)
+
+            # Check for end conditions
+            if command.is_terminal:
+                logger.info(f"Automation ended with status: {command.command_type}")
+                self.finish_run()
+                return command
+
+            # Execute command
+            self.execute_command(command)
+            self.steps += 1
+
+        logger.warning(f"Automation stopped after reaching max_steps ({self.config.max_steps})")
+        self.finish_run()
+        return None
 
 
 def main():
     """Main entry point for the automation script"""
+    automator = None
     try:
         logger.info("Starting automation process")
         # Load configuration
@@ -238,21 +847,13 @@ def main():
         # Get test condition from user
         user_prompt = input("Enter the condition you would like to be tested: ")
 
-        while True:
-            logger.debug("Processing next automation cycle")
-            # Get current UI state
-            ui_hierarchy = automator.get_ui_hierarchy()
-
-            # Get next command from LLM
-            command = automator.query_llm(ui_hierarchy, user_prompt)
-
-            # Check for end conditions
-            if command.command_type in (CommandType.END, CommandType.ERROR):
-                logger.info(f"Automation ended with status: {command.command_type}")
-                break
+        if config.pipeline:
+            import asyncio
+            from pipeline import run_pipeline
+            asyncio.run(run_pipeline(automator, user_prompt))
+            return
 
-            # Execute command
-            automator.execute_command(command)
+        automator.run(user_prompt)
     except KeyboardInterrupt:
         logger.info("Automation stopped by user")
     except Exception as e:
@@ -260,6 +861,8 @@ def main():
         raise
     finally:
         logger.info("Cleaning up resources...")
+        if automator is not None:
+            automator.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
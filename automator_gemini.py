@@ -1,6 +1,5 @@
 import os
 import json
-import re
 from adb_interface import TouchInterface
 from dotenv import load_dotenv
 import google.generativeai as genai
@@ -12,7 +11,11 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 # Gemini setup
 genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# JSON mode makes Gemini reply with the bare command object, without code fences
+model = genai.GenerativeModel(
+    "gemini-1.5-flash",
+    generation_config=genai.GenerationConfig(response_mime_type="application/json")
+)
 
 # Load the system prompt from the local file
 with open(PROMPT_FILE_NAME, "r") as file:
@@ -41,8 +44,7 @@ def enter_input():
     print("==========")
     
     try:
-        cleaned_json = re.sub(r'```\s*\w*\s*|\s*```', '', response.text.strip())
-        response_json = json.loads(cleaned_json)
+        response_json = json.loads(response.text)
         return response_json
     except json.JSONDecodeError:
         print("Error: Unable to parse JSON response")
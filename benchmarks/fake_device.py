@@ -0,0 +1,301 @@
+"""
+A simulated Android device served over the adb server protocol.
+
+SimulatedDevice is a state machine over recorded (or generated) uiautomator
+screens: taps are resolved to the element under the finger and follow the
+screen's transition table, BACK pops the back stack and HOME resets it.
+FakeAdbServer exposes the device on a local TCP port speaking enough of the
+adb smart-socket protocol for the "socket" backend (devices, transport,
+shell and exec services).
+"""
+import glob
+import os
+import re
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from node_table import CLICKABLE, parse_node_table
+
+SHELL_SENTINEL = re.compile(r'^(.*) 2>&1; echo "(__ADB_STATUS_\w+__)\$\?"$', re.DOTALL)
+# Attribute order as written by uiautomator
+NODE_DEFAULTS = (
+    'checkable="false" checked="false" clickable="{clickable}" enabled="true" focusable="{clickable}" '
+    'focused="false" scrollable="{scrollable}" long-clickable="false" password="false" selected="false"'
+)
+
+
+def _node(index: int, cls: str, package: str, bounds: str, text: str = "", resource_id: str = "",
+          desc: str = "", clickable: bool = False, scrollable: bool = False, children: str = "") -> str:
+    attrs = (
+        f'index="{index}" text="{escape(text)}" resource-id="{resource_id}" class="{cls}" '
+        f'package="{package}" content-desc="{escape(desc)}" '
+        + NODE_DEFAULTS.format(clickable=str(clickable).lower(), scrollable=str(scrollable).lower())
+        + f' bounds="{bounds}"'
+    )
+    if children:
+        return f'<node {attrs}>{children}</node>'
+    return f'<node {attrs} />'
+
+
+def make_screen(package: str, title: str, items: List[str], padding: int = 40) -> str:
+    """
+    Generate a realistic uiautomator dump: status bar, toolbar, a list of
+    clickable rows with title and summary, plus decorative layout nodes.
+
+    Args:
+        package: App package name
+        title: Toolbar title
+        items: Row titles
+        padding: Number of extra non-interactive nodes, to reach realistic dump sizes
+    """
+    status_bar = _node(
+        0, "android.widget.FrameLayout", "com.android.systemui", "[0,0][1080,63]",
+        resource_id="com.android.systemui:id/status_bar",
+        children=_node(0, "android.widget.TextView", "com.android.systemui", "[30,0][150,63]",
+                       text="{clock}", resource_id="com.android.systemui:id/clock")
+        + _node(1, "android.widget.ImageView", "com.android.systemui", "[950,0][1050,63]",
+                desc="Battery {battery} percent", resource_id="com.android.systemui:id/battery")
+    )
+    toolbar = _node(
+        1, "android.view.ViewGroup", package, "[0,63][1080,210]", resource_id=f"{package}:id/toolbar",
+        children=_node(0, "android.widget.TextView", package, "[42,100][700,180]", text=title,
+                       resource_id=f"{package}:id/title")
+    )
+
+    rows = []
+    for i, item in enumerate(items):
+        top = 210 + i * 160
+        row_children = (
+            _node(0, "android.widget.ImageView", package, f"[42,{top + 40}][122,{top + 120}]",
+                  resource_id="android:id/icon")
+            + _node(1, "android.widget.TextView", package, f"[168,{top + 30}][1000,{top + 90}]",
+                    text=item, resource_id="android:id/title")
+            + _node(2, "android.widget.TextView", package, f"[168,{top + 90}][1000,{top + 140}]",
+                    text=f"{item} options and preferences", resource_id="android:id/summary")
+        )
+        rows.append(_node(i, "android.widget.LinearLayout", package, f"[0,{top}][1080,{top + 160}]",
+                          clickable=True, children=row_children))
+    recycler = _node(2, "androidx.recyclerview.widget.RecyclerView", package, "[0,210][1080,1920]",
+                     resource_id=f"{package}:id/recycler_view", scrollable=True, children="".join(rows))
+
+    decoration = "".join(
+        _node(i, "android.view.View", package, f"[0,{1900 + i % 20}][1080,{1901 + i % 20}]",
+              resource_id=f"{package}:id/divider_{i}")
+        for i in range(padding)
+    )
+
+    content = _node(0, "android.widget.FrameLayout", package, "[0,0][1080,1920]",
+                    children=status_bar + toolbar + recycler + decoration)
+    return (
+        "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>"
+        f'<hierarchy rotation="0">{content}</hierarchy>'
+    )
+
+
+def default_screens() -> Dict[str, str]:
+    """A small settings-app-like set of screens"""
+    return {
+        "home": make_screen("com.android.launcher3", "Home",
+                            ["Settings", "Contacts", "Browser", "Camera", "Clock", "Files"]),
+        "Settings": make_screen("com.android.settings", "Settings",
+                                ["Network & internet", "Connected devices", "Apps", "Notifications",
+                                 "Battery", "Storage", "Sound & vibration", "Display", "Accessibility",
+                                 "Security", "Privacy", "Location", "System", "About phone"]),
+        "Network & internet": make_screen("com.android.settings", "Network & internet",
+                                          ["Internet", "Calls & SMS", "Airplane mode", "Hotspot & tethering",
+                                           "Data Saver", "VPN", "Private DNS"]),
+        "Internet": make_screen("com.android.settings", "Internet",
+                                ["Wi-Fi", "AndroidWifi", "Add network", "Saved networks", "Network preferences"]),
+        "Display": make_screen("com.android.settings", "Display",
+                               ["Brightness level", "Adaptive brightness", "Dark theme", "Screen timeout",
+                                "Auto-rotate screen", "Font size", "Display size"]),
+        "About phone": make_screen("com.android.settings", "About phone",
+                                   ["Device name", "Phone number", "Legal information", "SIM status",
+                                    "Model", "Android version", "IP address", "Build number"]),
+    }
+
+
+def load_screens(directory: str) -> Dict[str, str]:
+    """Load recorded dumps (*.xml) from a directory, keyed by file name without extension"""
+    screens = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.xml"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            screens[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return screens
+
+
+class SimulatedDevice:
+    """
+    State machine over UI screens driven by taps and key presses.
+
+    Tapping an element whose label names another screen navigates to it;
+    anything else leaves the screen unchanged. The status bar clock and
+    battery level change over time, like on a real device.
+    """
+
+    def __init__(self, screens: Dict[str, str], start: str = "home", latency: float = 0.0):
+        self.screens = screens
+        self.start = start if start in screens else next(iter(screens))
+        self.latency = latency
+        self.current = self.start
+        self.back_stack: List[str] = []
+        self.taps = 0
+        self.texts: List[str] = []
+        self._tables = {name: parse_node_table(self._render(xml)) for name, xml in screens.items()}
+        self._lock = threading.Lock()
+        self._suggestions = 0
+
+    @staticmethod
+    def _render(xml: str) -> str:
+        now = time.localtime()
+        return xml.replace("{clock}", time.strftime("%H:%M", now)).replace("{battery}", str(100 - now.tm_min % 50))
+
+    def dump(self) -> str:
+        """Current screen as uiautomator XML"""
+        time.sleep(self.latency)
+        with self._lock:
+            return self._render(self.screens[self.current])
+
+    def focus(self) -> str:
+        """Current screen as `dumpsys window` focus lines"""
+        with self._lock:
+            return f"  mCurrentFocus=Window{{1a2b3c u0 com.example/{self.current}}}\n"
+
+    def tap(self, x: int, y: int) -> None:
+        """Tap at screen coordinates, following the transition for the tapped element"""
+        time.sleep(self.latency)
+        with self._lock:
+            self.taps += 1
+            table = self._tables[self.current]
+            node = table.find_node_at(x, y)
+            target = table.node_label(node) if node >= 0 else ""
+            if target in self.screens and target != self.current:
+                self.back_stack.append(self.current)
+                self.current = target
+
+    def key(self, keycode: int) -> None:
+        """Press a key: BACK pops the back stack, HOME returns to the start screen"""
+        time.sleep(self.latency)
+        with self._lock:
+            if keycode == 4 and self.back_stack:
+                self.current = self.back_stack.pop()
+            elif keycode == 3:
+                self.back_stack.clear()
+                self.current = self.start
+
+    def suggest_command(self) -> str:
+        """
+        Pick a plausible next command, acting as the oracle behind the stub LLM.
+
+        Cycles through the clickable rows of the current screen; on screens
+        with no outgoing transitions it alternates between a tap and BACK.
+        """
+        with self._lock:
+            self._suggestions += 1
+            table = self._tables[self.current]
+            rows = [index for index, flags in enumerate(table.flags) if flags & CLICKABLE]
+            if not rows or (self.back_stack and self._suggestions % 3 == 0):
+                return "key 4"
+            x, y = table.center(rows[self._suggestions % len(rows)])
+            return f"touch {x} {y}"
+
+    def run_shell(self, command: str) -> str:
+        """Execute a device shell command line and return its output"""
+        output = []
+        for part in re.split(r'\s*(?:&&|;)\s*', command):
+            args = part.split()
+            if not args:
+                continue
+            if args[:2] == ['input', 'tap']:
+                self.tap(int(args[2]), int(args[3]))
+            elif args[:2] == ['input', 'keyevent']:
+                self.key(int(args[2]))
+            elif args[:2] == ['input', 'text']:
+                self.texts.append(" ".join(args[2:]))
+            elif args[:1] == ['dumpsys']:
+                output.append(self.focus())
+            elif args[:2] == ['settings', 'get']:
+                output.append("com.android.inputmethod.latin/.LatinIME\n")
+            elif args[:2] == ['wm', 'size']:
+                output.append("Physical size: 1080x1920\n")
+        return "".join(output)
+
+
+class _AdbHandler(socketserver.BaseRequestHandler):
+    def _read(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+        return data
+
+    def handle(self) -> None:
+        device: SimulatedDevice = self.server.device
+        try:
+            while True:
+                request = self._read(int(self._read(4), 16)).decode('utf-8')
+                if request == "host:devices":
+                    listing = f"{self.server.serial}\tdevice\n".encode('utf-8')
+                    self.request.sendall(b"OKAY" + b"%04x" % len(listing) + listing)
+                    return
+                if request.startswith("host:transport"):
+                    self.request.sendall(b"OKAY")
+                    continue
+                if request.startswith("shell:"):
+                    self.request.sendall(b"OKAY")
+                    match = SHELL_SENTINEL.match(request[len("shell:"):])
+                    command, sentinel = (match.group(1), match.group(2)) if match else (request[6:], None)
+                    output = device.run_shell(command)
+                    if sentinel:
+                        output += f"{sentinel}0\n"
+                    self.request.sendall(output.encode('utf-8'))
+                    return
+                if request.startswith("exec:"):
+                    self.request.sendall(b"OKAY")
+                    if "uiautomator dump" in request:
+                        self.request.sendall(
+                            (device.dump() + "UI hierchary dumped to: /dev/tty\n").encode('utf-8')
+                        )
+                    else:
+                        self.request.sendall(device.run_shell(request[len("exec:"):]).encode('utf-8'))
+                    return
+                message = f"unsupported request: {request}".encode('utf-8')
+                self.request.sendall(b"FAIL" + b"%04x" % len(message) + message)
+                return
+        except (EOFError, ConnectionError):
+            return
+
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    """adb server stand-in exposing one SimulatedDevice on localhost"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, device: SimulatedDevice, serial: str = "emulator-5554", port: int = 0):
+        super().__init__(("127.0.0.1", port), _AdbHandler)
+        self.device = device
+        self.serial = serial
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> 'FakeAdbServer':
+        """Serve in a background thread"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def start_fake_device(screens: Optional[Dict[str, str]] = None, latency: float = 0.0) -> FakeAdbServer:
+    """Create a simulated device with the given (or default) screens and serve it"""
+    return FakeAdbServer(SimulatedDevice(screens or default_screens(), latency=latency)).start()
@@ -0,0 +1,141 @@
+"""
+A stub Ollama server for benchmarks.
+
+Implements POST /api/chat (streaming and non-streaming) on localhost. The reply
+is chosen by a callback, usually SimulatedDevice.suggest_command, and wrapped in
+the JSON the automator expects, followed by trailing end-of-message tokens as
+small local models often emit, unless the request constrains the output with a
+`format`. Inference latency is simulated from the prompt size so that
+prompt-shrinking changes show up in the numbers.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+TRAILER = " <|eom_id|>\n\n"
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle's algorithm and delayed ACKs stall each reply
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def handle(self) -> None:
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client dropped a kept-alive connection, e.g. after closing a stream early
+            pass
+
+    def do_POST(self) -> None:
+        if self.path != "/api/chat":
+            self.send_error(404)
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+        server: StubOllamaServer = self.server
+        prompt_chars = sum(len(message.get('content', '')) for message in body.get('messages', []))
+        prompt_tokens = prompt_chars // 4 + 1
+        prefill = body.get('options', {}).get('num_predict') == 1
+
+        with server.lock:
+            server.requests += 1
+            server.prompt_tokens += prompt_tokens
+
+        time.sleep(server.base_latency + prompt_tokens * server.per_token_latency)
+        content = "{" if prefill else json.dumps({"command": server.reply()})
+        if not prefill and not body.get('format'):
+            content += TRAILER
+        done = {
+            "model": body.get('model', ''),
+            "created_at": "2024-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": len(content) // 4 + 1,
+            "total_duration": 0,
+        }
+
+        if not body.get('stream', True):
+            done["message"]["content"] = content
+            payload = json.dumps(done).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for start in range(0, len(content), 4):
+                chunk = {
+                    "model": body.get('model', ''),
+                    "created_at": "2024-01-01T00:00:00Z",
+                    "message": {"role": "assistant", "content": content[start:start + 4]},
+                    "done": False,
+                }
+                self._write_chunk(json.dumps(chunk) + "\n")
+                time.sleep(server.per_output_token_latency)
+            self._write_chunk(json.dumps(done) + "\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early once it had a complete command
+            pass
+        finally:
+            # A client that stopped reading mid-stream will not reuse the connection
+            self.close_connection = True
+
+    def _write_chunk(self, data: str) -> None:
+        encoded = data.encode('utf-8')
+        self.wfile.write(b"%x\r\n" % len(encoded) + encoded + b"\r\n")
+        self.wfile.flush()
+
+
+class StubOllamaServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Ollama chat API.
+
+    Attributes:
+        reply (Callable[[], str]): Returns the next command string
+        base_latency (float): Fixed seconds per request
+        per_token_latency (float): Seconds per prompt token (prompt evaluation)
+        per_output_token_latency (float): Seconds per streamed output chunk
+        requests (int): Number of chat requests served
+        prompt_tokens (int): Total estimated prompt tokens received
+    """
+
+    daemon_threads = True
+
+    def __init__(self, reply: Callable[[], str], base_latency: float = 0.0,
+                 per_token_latency: float = 0.0, per_output_token_latency: float = 0.0, port: int = 0):
+        super().__init__(("127.0.0.1", port), _ChatHandler)
+        self.reply = reply
+        self.base_latency = base_latency
+        self.per_token_latency = per_token_latency
+        self.per_output_token_latency = per_output_token_latency
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.lock = threading.Lock()
+
+    @property
+    def host(self) -> str:
+        return f"127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> 'StubOllamaServer':
+        """Serve in a background thread"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
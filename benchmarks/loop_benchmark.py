@@ -0,0 +1,228 @@
+"""
+End-to-end benchmark of the automation loop without real hardware.
+
+Drives Automator.run against a simulated device (served over the adb server
+protocol, using the "socket" backend) and a stub Ollama server, then reports
+steps per second, per-stage latency percentiles and memory growth:
+
+    python benchmarks/loop_benchmark.py --steps 500
+    python benchmarks/loop_benchmark.py --ui-format xml --per-token-latency 0.00002
+    python benchmarks/loop_benchmark.py --screens recorded_dumps/ --json results.json
+
+Stages:
+    capture    Automator.get_ui_hierarchy (including settle detection)
+    parse      node_table.parse_node_table
+    prompt     screen description and history assembly
+    inference  the chat request, including the stub's simulated latency
+    execute    Automator.execute_command
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from fake_device import default_screens, load_screens, start_fake_device  # noqa: E402
+from fake_ollama import StubOllamaServer  # noqa: E402
+
+STAGES = ("capture", "parse", "prompt", "inference", "execute")
+
+
+class StageRecorder:
+    """Wraps callables to record their durations per stage"""
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.durations[stage].append(time.perf_counter() - start)
+        return timed
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def element_id_reply(suggest: Callable[[], str], element_index) -> Callable[[], str]:
+    """Turn the oracle's touch commands into taps on the numbered element at the same point"""
+    def reply() -> str:
+        command = suggest()
+        parts = command.split()
+        if parts[0] == "touch":
+            target = (int(parts[1]), int(parts[2]))
+            for element_id in range(1, len(element_index) + 1):
+                if element_index.center(element_id) == target:
+                    return f"tap {element_id}"
+        return command
+    return reply
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict:
+    screens = load_screens(args.screens) if args.screens else default_screens()
+    adb_server = start_fake_device(screens, latency=args.device_latency)
+    llm_server = StubOllamaServer(
+        adb_server.device.suggest_command,
+        base_latency=args.base_latency,
+        per_token_latency=args.per_token_latency,
+        per_output_token_latency=args.output_latency
+    ).start()
+
+    # adb_client reads the server port when first imported
+    os.environ['ANDROID_ADB_SERVER_PORT'] = str(adb_server.port)
+    import automator as automator_module
+    from automator import Automator, AutomatorConfig
+
+    automator_module.logger.setLevel(args.log_level)
+    config = AutomatorConfig(
+        prompt_file=os.path.join(REPO_DIR, "prompt.txt"),
+        llm_model="stub",
+        ollama_host=llm_server.host,
+        adb_backend="socket",
+        ui_format=args.ui_format,
+        ui_diff=args.ui_diff,
+        element_ids=args.element_ids,
+        settle_mode=args.settle_mode,
+        llm_stream=not args.no_stream,
+        llm_format=None if args.llm_format == "none" else args.llm_format,
+        command_cache_size=args.cache_size,
+        max_steps=args.steps,
+        telemetry_file=args.telemetry,
+        metrics_port=args.metrics_port
+    )
+
+    if args.memory:
+        tracemalloc.start()
+    automator = Automator(config)
+    if automator.element_index is not None:
+        llm_server.reply = element_id_reply(adb_server.device.suggest_command, automator.element_index)
+
+    recorder = StageRecorder()
+    automator_module.parse_node_table = recorder.wrap("parse", automator_module.parse_node_table)
+    automator.get_ui_hierarchy = recorder.wrap("capture", automator.get_ui_hierarchy)
+    automator.describe_screen = recorder.wrap("prompt", automator.describe_screen)
+    automator.history.build_messages = recorder.wrap("prompt", automator.history.build_messages)
+    automator._chat = recorder.wrap("inference", automator._chat)
+
+    memory_samples: List[int] = []
+    execute = recorder.wrap("execute", automator.execute_command)
+
+    def execute_and_sample(command):
+        execute(command)
+        if args.memory:
+            memory_samples.append(tracemalloc.get_traced_memory()[0])
+    automator.execute_command = execute_and_sample
+
+    start = time.perf_counter()
+    try:
+        automator.run("Explore the settings app")
+    finally:
+        elapsed = time.perf_counter() - start
+        automator.close()
+        adb_server.stop()
+        llm_server.stop()
+
+    results = {
+        "steps": automator.steps,
+        "seconds": elapsed,
+        "steps_per_second": automator.steps / elapsed if elapsed else 0.0,
+        "llm_requests": llm_server.requests,
+        "mean_prompt_tokens": llm_server.prompt_tokens / max(1, llm_server.requests),
+        "stages": {
+            stage: {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p95_ms": percentile(values, 0.95) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": max(values) * 1000,
+                "total_s": sum(values),
+            }
+            for stage, values in ((stage, recorder.durations[stage]) for stage in STAGES) if values
+        },
+    }
+
+    if args.memory and memory_samples:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        half = len(memory_samples) // 2
+        results["memory"] = {
+            "first_step_kb": memory_samples[0] / 1024,
+            "last_step_kb": memory_samples[-1] / 1024,
+            "peak_kb": peak / 1024,
+            # Growth between the first and second half of the run, normalised per 100 steps
+            "growth_kb_per_100_steps": (
+                (statistics.mean(memory_samples[half:]) - statistics.mean(memory_samples[:half or 1]))
+                / max(1, len(memory_samples) - half) * 100 / 1024
+            ),
+        }
+    return results
+
+
+def format_results(results: Dict) -> str:
+    lines = [
+        f"steps: {results['steps']} in {results['seconds']:.2f}s "
+        f"({results['steps_per_second']:.1f} steps/s), "
+        f"{results['llm_requests']} LLM requests, {results['mean_prompt_tokens']:.0f} prompt tokens/request",
+        "",
+        f"{'stage':<10} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'total s':>8}",
+    ]
+    for stage, stats in results["stages"].items():
+        lines.append(
+            f"{stage:<10} {stats['count']:>6} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+            f"{stats['p99_ms']:>8.2f} {stats['max_ms']:>8.2f} {stats['total_s']:>8.2f}"
+        )
+    memory = results.get("memory")
+    if memory:
+        lines += [
+            "",
+            f"memory: {memory['first_step_kb']:.0f} KB after first step, {memory['last_step_kb']:.0f} KB at end, "
+            f"peak {memory['peak_kb']:.0f} KB, growth {memory['growth_kb_per_100_steps']:.1f} KB/100 steps",
+        ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the automation loop against a fake device and LLM")
+    parser.add_argument('--steps', type=int, default=200, help="Number of steps to run")
+    parser.add_argument('--screens', help="Directory of recorded uiautomator dumps (*.xml)")
+    parser.add_argument('--ui-format', default="compact", choices=["compact", "xml"])
+    parser.add_argument('--ui-diff', action='store_true', help="Send small screen changes as deltas")
+    parser.add_argument('--element-ids', action='store_true', help="Number elements and reply with tap <id>")
+    parser.add_argument('--settle-mode', default="off", choices=["off", "focus", "hierarchy"])
+    parser.add_argument('--cache-size', type=int, default=0, help="Command cache size (0 disables)")
+    parser.add_argument('--no-stream', action='store_true', help="Disable streaming LLM replies")
+    parser.add_argument('--llm-format', default="schema", choices=["schema", "json", "none"],
+                        help="Constrained decoding format sent to the LLM")
+    parser.add_argument('--device-latency', type=float, default=0.0, help="Seconds per simulated device action")
+    parser.add_argument('--base-latency', type=float, default=0.0, help="Seconds per simulated LLM request")
+    parser.add_argument('--per-token-latency', type=float, default=0.0, help="Seconds per prompt token")
+    parser.add_argument('--output-latency', type=float, default=0.0, help="Seconds per streamed output chunk")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="Skip tracemalloc tracking")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    parser.add_argument('--telemetry', help="Enable automator telemetry, writing its JSONL trace here")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus metrics on this port during the run")
+    parser.add_argument('--log-level', default="WARNING", help="Automator log level during the run")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    print(format_results(results))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
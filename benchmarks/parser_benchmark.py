@@ -0,0 +1,88 @@
+"""
+Benchmark uiautomator dump parsers.
+
+Compares xml.etree, ui_tree.parse_hierarchy (etree plus UINode trees) and the
+NodeTable parser on a generated dump of about 100 KB, or on recorded dumps:
+
+    python benchmarks/parser_benchmark.py [--size 100] [--repeat 200] [dump.xml ...]
+
+Every parser's output is checked against parse_hierarchy before timing.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from fake_device import make_screen  # noqa: E402
+from node_table import parse_node_table, parse_nodes  # noqa: E402
+from ui_tree import parse_hierarchy  # noqa: E402
+
+
+def generated_dump(size_kb: int) -> bytes:
+    """A settings-like dump padded with layout nodes to roughly `size_kb` kilobytes"""
+    items = [f"Setting {i} & more" for i in range(40)]
+    padding = 0
+    while True:
+        dump = make_screen("com.android.settings", "Settings", items, padding)
+        dump = dump.replace("{clock}", "12:30").replace("{battery}", "80")
+        if len(dump) >= size_kb * 1024:
+            return dump.encode('utf-8') + b"UI hierchary dumped to: /dev/tty\n"
+        padding += 20
+
+
+def time_parser(parse, data, repeat: int):
+    """Mean and best wall time of `repeat` calls"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(data)
+        durations.append(time.perf_counter() - start)
+    return statistics.mean(durations), min(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark uiautomator dump parsers")
+    parser.add_argument('dumps', nargs='*', help="Recorded dumps; a generated one is used if omitted")
+    parser.add_argument('--size', type=int, default=100, help="Size of the generated dump in KB")
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.dumps:
+        dumps = []
+        for path in args.dumps:
+            with open(path, 'rb') as f:
+                dumps.append((os.path.basename(path), f.read()))
+    else:
+        dumps = [(f"generated {args.size} KB", generated_dump(args.size))]
+
+    for name, raw in dumps:
+        # etree needs the XML alone, without the status line uiautomator appends
+        xml = raw[:raw.rfind(b'>') + 1]
+        reference = parse_hierarchy(xml.decode('utf-8'))
+        if parse_nodes(raw) != reference:
+            raise SystemExit(f"{name}: NodeTable output differs from parse_hierarchy")
+
+        table = parse_node_table(raw)
+        print(f"{name}: {len(raw) / 1024:.0f} KB, {len(table)} nodes, "
+              f"{len(table.classes.values)} classes, {len(table.resource_id_strings.values)} resource ids")
+
+        parsers = {
+            "xml.etree fromstring": (ET.fromstring, xml),
+            "parse_hierarchy (etree + UINode)": (lambda data: parse_hierarchy(data.decode('utf-8')), xml),
+            "parse_node_table (bytes)": (parse_node_table, raw),
+            "parse_node_table (str)": (parse_node_table, raw.decode('utf-8')),
+            "parse_nodes (table + UINode)": (parse_nodes, raw),
+        }
+        print(f"  {'parser':<34} {'mean ms':>8} {'best ms':>8} {'MB/s':>7}")
+        for label, (parse, data) in parsers.items():
+            mean, best = time_parser(parse, data, args.repeat)
+            print(f"  {label:<34} {mean * 1000:>8.2f} {best * 1000:>8.2f} {len(raw) / mean / 1e6:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark text entry methods on a connected device.
+
+Focus an empty, multi-line text field on the device, then run:
+
+    python benchmarks/text_input_benchmark.py [--device SERIAL] [--backend session]
+
+Each method types 1 KB and 10 KB payloads of words separated by spaces. The
+field is cleared between runs with select-all + delete.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adb_interface import create_touch_interface  # noqa: E402
+from text_input import TextEntryEngine, escape_input_text  # noqa: E402
+
+KEYCODE_MOVE_END = 123
+KEYCODE_DEL = 67
+
+
+def make_payload(size: int) -> str:
+    """Words separated by spaces, with a few shell metacharacters, `size` characters long"""
+    words = ["alpha", "beta", "gamma;", "delta's", "epsilon&", "zeta"]
+    text = ""
+    while len(text) < size:
+        text += words[len(text) % len(words)] + " "
+    return text[:size]
+
+
+def clear_field(touch_interface) -> None:
+    """Delete everything in the focused field"""
+    touch_interface._run_adb_command(['shell', 'input', 'keycombination', '113', '29'])  # CTRL+A
+    touch_interface._run_adb_command(['shell', 'input', 'keyevent', str(KEYCODE_DEL)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text entry methods")
+    parser.add_argument('--device', help="Device serial")
+    parser.add_argument('--backend', default="subprocess", help="ADB backend to use")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1024, 10240], help="Payload sizes in bytes")
+    args = parser.parse_args()
+
+    touch_interface = create_touch_interface(args.backend, args.device)
+    engine = TextEntryEngine(touch_interface)
+
+    methods = {
+        # One escaped `input text` call without chunking
+        "single input text": lambda text: touch_interface._run_adb_command(
+            ['shell', 'input', 'text', escape_input_text(text)]
+        ),
+        "chunked input text": lambda text: touch_interface._run_adb_command(
+            ['shell', " && ".join(engine.input_text_commands(text))]
+        ),
+    }
+    if engine.ime_active:
+        methods["ime broadcast"] = lambda text: touch_interface._run_adb_command(
+            ['shell', engine.ime_command(text)]
+        )
+    else:
+        print("ADBKeyBoard IME is not active; skipping the ime broadcast method")
+
+    print(f"{'method':<20} {'bytes':>7} {'seconds':>9} {'chars/s':>9}")
+    for size in args.sizes:
+        payload = make_payload(size)
+        for name, method in methods.items():
+            clear_field(touch_interface)
+            start = time.perf_counter()
+            method(payload)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<20} {size:>7} {elapsed:>9.2f} {size / elapsed:>9.0f}")
+
+    clear_field(touch_interface)
+    touch_interface.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(fingerprint: str, user_prompt: str, recent_actions: Iterable[str]) -> str:
+    """
+    Build a cache key from the screen, the tester prompt and recent actions.
+
+    Args:
+        fingerprint: Screen fingerprint from NodeTable.fingerprint
+        user_prompt: User's test condition
+        recent_actions: Summaries of the last few actions, oldest first
+
+    Returns:
+        str: Hex digest key
+    """
+    digest = hashlib.sha1()
+    for part in (fingerprint, user_prompt, *recent_actions):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class CommandCache:
+    """
+    LRU cache mapping screen-state keys to the LLM reply chosen for them.
+
+    A hit lets the automator reuse an earlier decision instead of querying the
+    LLM. Entries can optionally be persisted to a JSON file so later runs start warm.
+    Safe to share between automators running in different threads.
+
+    Attributes:
+        max_entries (int): Maximum number of cached replies
+        path (Optional[str]): JSON file used for persistence, if any
+        hits (int): Number of successful lookups
+        misses (int): Number of failed lookups
+    """
+
+    def __init__(self, max_entries: int = 256, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached reply for the key, marking it most recently used"""
+        with self._lock:
+            reply = self._entries.get(key)
+            if reply is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return reply
+
+    def put(self, key: str, reply: str) -> None:
+        """Store a reply, evicting the least recently used entry when full"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = reply
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        """Remove an entry, e.g. after replaying its reply left the screen unchanged"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def load(self) -> None:
+        """Load entries from the persistence file"""
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load command cache from {self.path}: {e}")
+            return
+        for key, reply in entries:
+            self.put(key, reply)
+        logger.debug(f"Loaded {len(self._entries)} cached commands from {self.path}")
+
+    def save(self) -> None:
+        """Write entries to the persistence file, if one is configured"""
+        if not self.path:
+            return
+        with self._lock:
+            entries = list(self._entries.items())
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,199 @@
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from node_table import NodeTable
+from ui_tree import ElementIndex
+
+logger = logging.getLogger(__name__)
+
+KEY_NAMES = {3: "home", 4: "back", 24: "volume up", 25: "volume down", 26: "power", 66: "enter", 82: "menu"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def summarize_action(raw_command: str, table: NodeTable, element_index: Optional[ElementIndex] = None) -> str:
+    """
+    Describe a command in a few words, naming the element it targeted.
+
+    Args:
+        raw_command: Command string returned by the LLM, e.g. "touch 120 340"
+        table: Parsed hierarchy of the screen the command was issued on
+        element_index: Element ids of that screen, to describe "tap" commands
+
+    Returns:
+        str: Short description such as "touched 'Settings' at 120,340"
+    """
+    if ';' in raw_command:
+        return ", then ".join(summarize_action(part, table, element_index) for part in raw_command.split(';'))
+
+    parts = raw_command.split()
+    if not parts:
+        return "no action"
+    name, args = parts[0], parts[1:]
+
+    try:
+        if name == "touch" and len(args) == 2:
+            x, y = int(args[0]), int(args[1])
+            index = table.find_node_at(x, y)
+            label = table.node_label(index) if index >= 0 else ""
+            return f"touched '{label}' at {x},{y}" if label else f"touched {x},{y}"
+        if name == "tap" and len(args) == 1 and element_index is not None:
+            element = element_index.element(int(args[0].lstrip("#")))
+            x, y = element.node.center
+            return f"tapped '{element.label}' at {x},{y}" if element.label else f"tapped {x},{y}"
+        if name == "swipe" and len(args) >= 4:
+            return f"swiped from {args[0]},{args[1]} to {args[2]},{args[3]}"
+        if name == "key" and len(args) == 1:
+            keycode = int(args[0])
+            return f"pressed {KEY_NAMES[keycode]}" if keycode in KEY_NAMES else f"pressed key {keycode}"
+    except ValueError:
+        pass
+
+    if name == "text":
+        return f"entered text '{' '.join(args)}'"
+    return raw_command
+
+
+@dataclass
+class HistoryStep:
+    """One completed automation step"""
+    screen: str
+    response: str
+    action: str
+    title: str
+    outcome: str = ""
+    fingerprint: Optional[str] = None  # Identifies the screen regardless of how it was described
+
+    @property
+    def summary(self) -> str:
+        """One-line action log entry for the step"""
+        return f"{self.action} → {self.outcome}" if self.outcome else self.action
+
+
+class HistoryManager:
+    """
+    Bounded conversation history for LLM queries.
+
+    The most recent steps are kept verbatim (screen plus the model's reply);
+    older steps are collapsed into a compact action log. The whole history is
+    trimmed to fit a token budget so per-step prompt size stays flat over long runs.
+
+    Attributes:
+        max_screens (int): Number of recent steps kept verbatim
+        token_budget (int): Approximate token limit for the history messages
+        max_log_entries (int): Number of collapsed steps retained in the action log
+    """
+
+    def __init__(self, max_screens: int = 3, token_budget: int = 6000, max_log_entries: int = 100):
+        self.max_screens = max_screens
+        self.token_budget = token_budget
+        self.max_log_entries = max_log_entries
+        self._recent: Deque[HistoryStep] = deque()
+        self._log: Deque[str] = deque(maxlen=max_log_entries)
+        self._dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._recent) + len(self._log) + self._dropped
+
+    def record(self, screen: str, response: str, raw_command: str, table: NodeTable,
+               element_index: Optional[ElementIndex] = None, fingerprint: Optional[str] = None) -> None:
+        """
+        Record a completed step.
+
+        Args:
+            screen: Screen description sent to the LLM for this step
+            response: The LLM's reply
+            raw_command: Command string parsed from the reply
+            table: Parsed hierarchy of the screen, used to name targets
+            element_index: Element ids of the screen, used to name "tap" targets
+            fingerprint: Screen fingerprint, used to tell whether the previous
+                action changed the screen. Without it the descriptions are
+                compared, which fails when a screen is described as a delta
+        """
+        title = table.screen_title()
+        if self._recent:
+            previous = self._recent[-1]
+            if fingerprint is not None and previous.fingerprint is not None:
+                unchanged = previous.fingerprint == fingerprint
+            else:
+                unchanged = previous.screen == screen
+            previous.outcome = "screen unchanged" if unchanged else f"screen changed to '{title}'"
+
+        self._recent.append(HistoryStep(
+            screen, response, summarize_action(raw_command, table, element_index), title, fingerprint=fingerprint
+        ))
+        while len(self._recent) > self.max_screens:
+            self._collapse_oldest()
+
+    def _collapse_oldest(self) -> None:
+        if len(self._log) == self._log.maxlen:
+            self._dropped += 1
+        self._log.append(self._recent.popleft().summary)
+
+    def recent_actions(self, count: int) -> List[str]:
+        """
+        Summaries of the last `count` recorded steps, oldest first.
+
+        Args:
+            count: Number of steps to return
+        """
+        if count <= 0:
+            return []
+        entries = list(self._log)[-count:] + [step.summary for step in self._recent]
+        return entries[-count:]
+
+    def clear(self) -> None:
+        """Forget all recorded steps"""
+        self._recent.clear()
+        self._log.clear()
+        self._dropped = 0
+
+    def _log_message(self, log: List[str], dropped: int) -> Optional[Dict]:
+        if not log and not dropped:
+            return None
+        lines = ["Earlier steps:"]
+        if dropped:
+            lines.append(f"({dropped} earlier steps omitted)")
+        first = dropped + 1
+        lines.extend(f"{first + i}. {entry}" for i, entry in enumerate(log))
+        return {'role': 'user', 'content': "\n".join(lines)}
+
+    def build_messages(self) -> List[Dict]:
+        """
+        Assemble the history as chat messages within the token budget.
+
+        Returns:
+            List of messages: an action log of collapsed steps followed by the
+            recent steps as screen/reply pairs
+        """
+        log = list(self._log)
+        recent = list(self._recent)
+        dropped = self._dropped
+
+        def cost() -> int:
+            total = sum(estimate_tokens(entry) for entry in log)
+            return total + sum(estimate_tokens(step.screen) + estimate_tokens(step.response) for step in recent)
+
+        # Shed verbatim screens first, then the oldest log entries
+        total = cost()
+        while total > self.token_budget and recent:
+            step = recent.pop(0)
+            log.append(step.summary)
+            total = cost()
+        while total > self.token_budget and log:
+            total -= estimate_tokens(log.pop(0))
+            dropped += 1
+
+        messages = []
+        log_message = self._log_message(log, dropped)
+        if log_message:
+            messages.append(log_message)
+        for step in recent:
+            messages.append({'role': 'user', 'content': step.screen})
+            messages.append({'role': 'assistant', 'content': step.response})
+        return messages
@@ -0,0 +1,153 @@
+import logging
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+DEFAULT_PARALLELISM = 4
+
+
+@dataclass
+class BrokerMetrics:
+    """Snapshot of inference broker activity"""
+    submitted: int
+    completed: int
+    failed: int
+    queue_depth: int
+    max_queue_depth: int
+    in_flight: int
+    mean_wait: float
+    p95_wait: float
+    max_wait: float
+    mean_service: float
+
+    def summary(self) -> str:
+        """Format the metrics on one line"""
+        return (
+            f"requests={self.submitted} completed={self.completed} failed={self.failed} "
+            f"queue={self.queue_depth} (max {self.max_queue_depth}) in_flight={self.in_flight} "
+            f"wait mean={self.mean_wait * 1000:.0f}ms p95={self.p95_wait * 1000:.0f}ms "
+            f"max={self.max_wait * 1000:.0f}ms service mean={self.mean_service * 1000:.0f}ms"
+        )
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class InferenceBroker:
+    """
+    Central queue for LLM requests from concurrently running automators.
+
+    Requests from every session are queued here and dispatched to the Ollama
+    server with at most `parallelism` in flight, matching the number of
+    requests the server processes together (OLLAMA_NUM_PARALLEL). Callers block
+    until their own reply is routed back. Queue depth and wait times are
+    tracked so the inference server can be sized.
+
+    Attributes:
+        parallelism (int): Maximum number of concurrent LLM requests
+    """
+
+    def __init__(self, parallelism: Optional[int] = None, window: int = 1000):
+        """
+        Initialize the broker.
+
+        Args:
+            parallelism: Maximum concurrent requests; defaults to the
+                OLLAMA_NUM_PARALLEL environment variable, or 4
+            window: Number of recent requests kept for wait/service time statistics
+        """
+        if parallelism is None:
+            parallelism = int(os.environ.get('OLLAMA_NUM_PARALLEL', DEFAULT_PARALLELISM))
+        self.parallelism = max(1, parallelism)
+        self.window = window
+        self._executor = ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._started = 0
+        self._max_queue_depth = 0
+        self._waits: List[float] = []
+        self._services: List[float] = []
+
+    def run(self, request: Callable[..., T], *args) -> T:
+        """
+        Queue an LLM request and block until its result is available.
+
+        Args:
+            request: Callable performing the request against Ollama
+            *args: Arguments for the callable
+
+        Returns:
+            The callable's return value
+
+        Raises:
+            Exception: Whatever the request raised
+        """
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._submitted += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._submitted - self._started)
+
+        future = self._executor.submit(self._execute, submitted_at, request, *args)
+        return future.result()
+
+    def _execute(self, submitted_at: float, request: Callable[..., T], *args) -> T:
+        started_at = time.perf_counter()
+        with self._lock:
+            self._started += 1
+            self._record(self._waits, started_at - submitted_at)
+
+        try:
+            result = request(*args)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._record(self._services, time.perf_counter() - started_at)
+
+        with self._lock:
+            self._completed += 1
+        return result
+
+    def _record(self, values: List[float], value: float) -> None:
+        values.append(value)
+        if len(values) > self.window:
+            del values[:len(values) - self.window]
+
+    def metrics(self) -> BrokerMetrics:
+        """Take a snapshot of the broker's counters and timings"""
+        with self._lock:
+            waits = list(self._waits)
+            services = list(self._services)
+            finished = self._completed + self._failed
+            return BrokerMetrics(
+                submitted=self._submitted,
+                completed=self._completed,
+                failed=self._failed,
+                queue_depth=self._submitted - self._started,
+                max_queue_depth=self._max_queue_depth,
+                in_flight=self._started - finished,
+                mean_wait=statistics.mean(waits) if waits else 0.0,
+                p95_wait=_percentile(waits, 0.95),
+                max_wait=max(waits, default=0.0),
+                mean_service=statistics.mean(services) if services else 0.0
+            )
+
+    def close(self) -> None:
+        """Stop the worker threads once queued requests are done"""
+        self._executor.shutdown(wait=True)
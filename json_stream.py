@@ -0,0 +1,62 @@
+from typing import Optional
+
+
+class JSONObjectScanner:
+    """
+    Incrementally finds the first complete top-level JSON object in streamed text.
+
+    Tracks brace depth and string/escape state across chunks, so the object can
+    be extracted the moment its closing brace arrives, ignoring any text the
+    model emits before or after it.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._length = 0
+        self._start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.result: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        """All text fed so far"""
+        return "".join(self._buffer)
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Consume a chunk of streamed text.
+
+        Args:
+            chunk: Next piece of model output
+
+        Returns:
+            The first complete JSON object text once it has been seen, else None
+        """
+        if self.result is not None:
+            return self.result
+
+        offset = self._length
+        self._buffer.append(chunk)
+        self._length += len(chunk)
+        for i, char in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._depth > 0:
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._start = offset + i
+                self._depth += 1
+            elif char == '}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.result = self.text[self._start:offset + i + 1]
+                    return self.result
+        return None
@@ -0,0 +1,271 @@
+import bisect
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from adb_interface import TouchInterface
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ADB_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")).replace('"', "'") for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add `amount` to the count for the given labels"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    """Current value per label set"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the value for the given labels"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets, per label set"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LLM_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one value for the given labels"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+
+        lines = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric and return it"""
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STEPS = REGISTRY.register(Counter(
+    "automator_steps_total", "Commands executed on the device", ["device"]))
+LLM_LATENCY = REGISTRY.register(Histogram(
+    "automator_llm_request_seconds", "Duration of LLM chat requests", ["device"], LLM_BUCKETS))
+ADB_LATENCY = REGISTRY.register(Histogram(
+    "automator_adb_command_seconds", "Duration of adb commands by subcommand", ["subcommand"], ADB_BUCKETS))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "automator_command_cache_lookups_total", "Command cache lookups by result", ["result"]))
+HISTORY_TOKENS = REGISTRY.register(Gauge(
+    "automator_history_tokens", "Approximate token size of the history sent with the last request", ["device"]))
+FAILURES = REGISTRY.register(Counter(
+    "automator_command_failures_total", "Failed steps by command type", ["command_type"]))
+REPAIRS = REGISTRY.register(Counter(
+    "automator_command_repairs_total", "Invalid LLM replies sent back for correction, by outcome", ["result"]))
+
+
+def adb_subcommand(command: list) -> str:
+    """
+    Label for an adb command line, e.g. "shell:input" or "exec-out:uiautomator".
+
+    Only the adb subcommand and the first word of the device command are
+    kept, so the number of label values stays small.
+    """
+    if len(command) > 1 and command[0] in ('shell', 'exec-out'):
+        return f"{command[0]}:{command[1].split(' ', 1)[0]}"
+    return command[0] if command else ""
+
+
+class AutomatorMetrics:
+    """
+    Records one automator's activity into the process-wide metrics registry.
+
+    Every automator in the process (one per device under runner.py) shares the
+    same metrics, so a single endpoint covers the whole farm. Recording is a
+    dictionary update under a lock, cheap enough to leave enabled.
+
+    Attributes:
+        device (str): Value of the `device` label
+    """
+
+    def __init__(self, device: Optional[str] = None):
+        self.device = device or "default"
+
+    def instrument(self, touch_interface: TouchInterface) -> None:
+        """Observe the latency of every adb command the interface issues"""
+        run_adb_command = touch_interface._run_adb_command
+
+        def timed(command: list) -> str:
+            start = time.perf_counter()
+            try:
+                return run_adb_command(command)
+            finally:
+                ADB_LATENCY.observe(time.perf_counter() - start, subcommand=adb_subcommand(command))
+
+        touch_interface._run_adb_command = timed
+
+    def record_step(self) -> None:
+        """Count an executed command"""
+        STEPS.inc(device=self.device)
+
+    def record_llm_request(self, seconds: float) -> None:
+        """Observe the duration of an LLM request"""
+        LLM_LATENCY.observe(seconds, device=self.device)
+
+    def record_cache_lookup(self, hit: bool) -> None:
+        """Count a command cache hit or miss"""
+        CACHE_LOOKUPS.inc(result="hit" if hit else "miss")
+
+    def record_history_tokens(self, tokens: int) -> None:
+        """Set the history size of the latest request"""
+        HISTORY_TOKENS.set(tokens, device=self.device)
+
+    def record_repair(self, repaired: bool) -> None:
+        """Count an invalid reply that was corrected, or given up on"""
+        REPAIRS.inc(result="repaired" if repaired else "failed")
+
+    def record_failure(self, command_type: str) -> None:
+        """Count a failed step, labelled with its command type or `invalid`"""
+        FAILURES.inc(command_type=command_type)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(format % args)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """HTTP server exposing a registry at /metrics"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, registry: MetricsRegistry = REGISTRY):
+        super().__init__((host, port), _MetricsHandler)
+        self.registry = registry
+
+
+_server: Optional[MetricsServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> MetricsServer:
+    """
+    Serve the process-wide registry in a background thread.
+
+    Only one server runs per process; later calls return the running one.
+
+    Args:
+        port: TCP port for the /metrics endpoint
+        host: Address to bind; use "0.0.0.0" to allow remote scraping
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = MetricsServer(host, port)
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+            logger.info(f"Serving metrics on http://{host}:{_server.server_address[1]}/metrics")
+        elif _server.server_address[1] != port and port:
+            logger.warning(f"Metrics server already running on port {_server.server_address[1]}")
+        return _server
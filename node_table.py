@@ -0,0 +1,483 @@
+import hashlib
+import html
+import logging
+import re
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from ui_tree import (
+    EDITABLE_CLASSES, VOLATILE_PACKAGES, VOLATILE_TEXT_PATTERN, CompactElement, UINode, Verbosity, describe_node,
+    number_elements
+)
+
+logger = logging.getLogger(__name__)
+
+# Flag bits, one per boolean uiautomator attribute
+CLICKABLE = 1 << 0
+LONG_CLICKABLE = 1 << 1
+SCROLLABLE = 1 << 2
+CHECKABLE = 1 << 3
+CHECKED = 1 << 4
+FOCUSABLE = 1 << 5
+FOCUSED = 1 << 6
+SELECTED = 1 << 7
+ENABLED = 1 << 8
+PASSWORD = 1 << 9
+EDITABLE = 1 << 10  # Derived from the class name
+ACTIONABLE = CLICKABLE | LONG_CLICKABLE | SCROLLABLE | CHECKABLE | EDITABLE
+
+FLAG_ATTRIBUTES = {
+    'clickable': CLICKABLE,
+    'long-clickable': LONG_CLICKABLE,
+    'scrollable': SCROLLABLE,
+    'checkable': CHECKABLE,
+    'checked': CHECKED,
+    'focusable': FOCUSABLE,
+    'focused': FOCUSED,
+    'selected': SELECTED,
+    'enabled': ENABLED,
+    'password': PASSWORD,
+}
+
+# Attributes in the order uiautomator writes them, matched in one step. Any
+# other node tag falls through to the generic alternative.
+_BOOLEAN_RUN = (
+    r'checkable="\w+" checked="\w+" clickable="\w+" enabled="\w+" focusable="\w+" focused="\w+" '
+    r'scrollable="\w+" long-clickable="\w+" password="\w+" selected="\w+"'
+)
+_EXTRA_ATTRIBUTES = r'(?: [\w-]+="[^"]*")*'
+TAG_PATTERN = re.compile(
+    r'<node index="\d+" text="([^"]*)" resource-id="([^"]*)" class="([^"]*)" package="([^"]*)" '
+    r'content-desc="([^"]*)" (' + _BOOLEAN_RUN + ')' + _EXTRA_ATTRIBUTES
+    + r' bounds="\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]"' + _EXTRA_ATTRIBUTES + r'\s*(/?)>'
+    r'|<node\b([^>]*?)(/?)>|</node>|<hierarchy\b'
+)
+ATTRIBUTE_PATTERN = re.compile(r'([\w-]+)="([^"]*)"')
+BOUNDS_PATTERN = re.compile(r'\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]')
+
+# Flag bits per distinct run of boolean attributes; only a handful occur
+_flag_cache: Dict[str, int] = {}
+_editable_cache: Dict[str, bool] = {}
+
+
+class StringTable:
+    """Interns strings, mapping each distinct value to a small integer id"""
+
+    def __init__(self):
+        self.values: List[str] = [""]
+        self._ids: Dict[str, int] = {"": 0}
+
+    def intern(self, value: str) -> int:
+        """Return the id of a value, adding it if new"""
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return string_id
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.values[string_id]
+
+
+class NodeTable:
+    """
+    A parsed uiautomator dump stored as parallel arrays, one entry per node.
+
+    Nodes are numbered in document order. Bounds are packed four ints per node,
+    the boolean attributes are a bitfield, and class names, resource ids and
+    packages are ids into shared string tables. The tree is kept as a parent
+    index and the index one past each node's last descendant, so a subtree is
+    the contiguous range `[i, end[i])`.
+
+    Attributes:
+        bounds (array): x1, y1, x2, y2 of every node
+        flags (array): Flag bits of every node
+        parent (array): Parent index of every node, -1 for window roots
+        end (array): Index one past the node's last descendant
+        class_ids (array): Class name ids into `classes`
+        resource_ids (array): Resource id ids into `resource_id_strings`
+        package_ids (array): Package ids into `packages`
+        text (List[str]): Text of every node
+        content_desc (List[str]): Content description of every node
+    """
+
+    def __init__(self, classes: Optional[StringTable] = None, resource_id_strings: Optional[StringTable] = None,
+                 packages: Optional[StringTable] = None):
+        """
+        Create an empty table.
+
+        Args:
+            classes: String table for class names, to share interned strings between dumps
+            resource_id_strings: String table for resource ids
+            packages: String table for package names
+        """
+        self.bounds = array('i')
+        self.flags = array('H')
+        self.parent = array('i')
+        self.end = array('i')
+        self.class_ids = array('H')
+        self.resource_ids = array('H')
+        self.package_ids = array('H')
+        self.text: List[str] = []
+        self.content_desc: List[str] = []
+        self.classes = classes or StringTable()
+        self.resource_id_strings = resource_id_strings or StringTable()
+        self.packages = packages or StringTable()
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def class_name(self, index: int) -> str:
+        """Fully qualified class name of a node"""
+        return self.classes[self.class_ids[index]]
+
+    def resource_id(self, index: int) -> str:
+        """Resource id of a node"""
+        return self.resource_id_strings[self.resource_ids[index]]
+
+    def package(self, index: int) -> str:
+        """Package of the app owning a node"""
+        return self.packages[self.package_ids[index]]
+
+    def node_bounds(self, index: int) -> Tuple[int, int, int, int]:
+        """Bounds of a node as (x1, y1, x2, y2)"""
+        offset = index * 4
+        return tuple(self.bounds[offset:offset + 4])
+
+    def center(self, index: int) -> Tuple[int, int]:
+        """Pixel coordinates of the centre of a node"""
+        x1, y1, x2, y2 = self.bounds[index * 4:index * 4 + 4]
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    def visible(self, index: int) -> bool:
+        """Whether a node occupies any screen area"""
+        x1, y1, x2, y2 = self.bounds[index * 4:index * 4 + 4]
+        return x2 > x1 and y2 > y1
+
+    def label(self, index: int) -> str:
+        """A node's own visible text or content description"""
+        return self.text[index] or self.content_desc[index]
+
+    def descendant_label(self, index: int) -> str:
+        """The first visible text among a node's descendants"""
+        text, content_desc = self.text, self.content_desc
+        for descendant in range(index + 1, self.end[index]):
+            label = text[descendant] or content_desc[descendant]
+            if label:
+                return label
+        return ""
+
+    def node_label(self, index: int) -> str:
+        """A node's own label, or the first label found among its descendants"""
+        return self.label(index) or self.descendant_label(index)
+
+    def roots(self) -> Iterator[int]:
+        """Indices of the window root nodes"""
+        index = 0
+        while index < len(self):
+            yield index
+            index = self.end[index]
+
+    def children(self, index: int) -> Iterator[int]:
+        """Indices of a node's direct children"""
+        child = index + 1
+        while child < self.end[index]:
+            yield child
+            child = self.end[child]
+
+    def find_node_at(self, x: int, y: int) -> int:
+        """
+        Find the node a tap at (x, y) would most likely hit.
+
+        Returns:
+            Index of the smallest actionable node containing the point, or of
+            the smallest node of any kind if none is actionable; -1 if none does
+        """
+        best, best_area = -1, None
+        best_actionable, best_actionable_area = -1, None
+        bounds = self.bounds
+        for index, flags in enumerate(self.flags):
+            offset = index * 4
+            x1, y1, x2, y2 = bounds[offset], bounds[offset + 1], bounds[offset + 2], bounds[offset + 3]
+            if not (x1 <= x < x2 and y1 <= y < y2):
+                continue
+            area = max(0, x2 - x1) * max(0, y2 - y1)
+            if best_area is None or area <= best_area:
+                best, best_area = index, area
+            if flags & ACTIONABLE and (best_actionable_area is None or area <= best_actionable_area):
+                best_actionable, best_actionable_area = index, area
+        return best_actionable if best_actionable >= 0 else best
+
+    def screen_package(self) -> str:
+        """Package of the app in the foreground window"""
+        return next((self.package(root) for root in self.roots() if self.package_ids[root]), "")
+
+    def screen_title(self) -> str:
+        """
+        Guess a short human-readable name for the screen.
+
+        Prefers a node whose resource id looks like a title, then falls back
+        to the first visible text, then to the package name.
+        """
+        first_label = ""
+        for index in range(len(self)):
+            if not self.visible(index):
+                continue
+            label = self.label(index)
+            if not label:
+                continue
+            if 'title' in self.resource_id(index).rsplit('/', 1)[-1]:
+                return label
+            if not first_label:
+                first_label = label
+        return first_label or self.screen_package()
+
+    def fingerprint(self) -> str:
+        """
+        Hash the meaningful content of the screen.
+
+        Status bar nodes are skipped and clock times and percentages are masked,
+        so the same screen fingerprints identically regardless of time or battery.
+        The digest keys the command cache and recorded traces, so changing what
+        goes into it invalidates persisted entries.
+
+        Returns:
+            str: Hex digest identifying the screen state
+        """
+        child_counts = [0] * len(self)
+        for parent in self.parent:
+            if parent >= 0:
+                child_counts[parent] += 1
+
+        # Look names up once per string id rather than once per node
+        class_names, resource_ids, packages = self.classes.values, self.resource_id_strings.values, self.packages.values
+        volatile_packages = [package in VOLATILE_PACKAGES for package in packages]
+        volatile_ids = [resource_id.startswith(VOLATILE_PACKAGES) for resource_id in resource_ids]
+        mask = VOLATILE_TEXT_PATTERN.sub
+        bounds, flags, end = self.bounds, self.flags, self.end
+        lines = []
+        index = 0
+        while index < len(flags):
+            resource_id = self.resource_ids[index]
+            if volatile_packages[self.package_ids[index]] or volatile_ids[resource_id]:
+                index = end[index]
+                continue
+            text, desc = self.text[index], self.content_desc[index]
+            node_flags = flags[index]
+            offset = index * 4
+            lines.append(
+                f"{class_names[self.class_ids[index]]}|{resource_ids[resource_id]}|"
+                f"{mask('#', text) if text else text}|{mask('#', desc) if desc else desc}|"
+                f"({bounds[offset]}, {bounds[offset + 1]}, {bounds[offset + 2]}, {bounds[offset + 3]})|"
+                f"{bool(node_flags & CHECKED):d}{bool(node_flags & SELECTED):d}{bool(node_flags & ENABLED):d}|"
+                f"{child_counts[index]}\n"
+            )
+            index += 1
+        return hashlib.sha1("".join(lines).encode('utf-8')).hexdigest()
+
+    def node(self, index: int) -> UINode:
+        """A UINode for one node, without its children"""
+        flags = self.flags[index]
+        return UINode(
+            class_name=self.class_name(index),
+            bounds=self.node_bounds(index),
+            text=self.text[index],
+            content_desc=self.content_desc[index],
+            resource_id=self.resource_id(index),
+            package=self.package(index),
+            clickable=bool(flags & CLICKABLE),
+            long_clickable=bool(flags & LONG_CLICKABLE),
+            scrollable=bool(flags & SCROLLABLE),
+            checkable=bool(flags & CHECKABLE),
+            checked=bool(flags & CHECKED),
+            focused=bool(flags & FOCUSED),
+            selected=bool(flags & SELECTED),
+            enabled=bool(flags & ENABLED)
+        )
+
+    def compact_elements(self, verbosity: Verbosity = Verbosity.NORMAL,
+                         element_ids: bool = False) -> List[CompactElement]:
+        """
+        Select the elements a compact screen description shows, in document order.
+
+        Each line describes one actionable or text-bearing node as
+        `<center x>,<center y> <class> "<label>" [flags]`. UINodes are built
+        only for the selected nodes.
+
+        Args:
+            verbosity: Level of detail to include
+            element_ids: Number actionable elements from 1 in document order and
+                prefix their lines with `#<id>`, see ui_tree.number_elements
+
+        Returns:
+            List of elements with their tree path, label and description line
+        """
+        verbosity = Verbosity(verbosity)
+        short_classes = [class_name.rsplit('.', 1)[-1] for class_name in self.classes.values]
+        elements: List[CompactElement] = []
+        for position, root in enumerate(self.roots()):
+            self._compact_nodes(
+                root, verbosity, short_classes, elements, "", f"{short_classes[self.class_ids[root]]}{position}"
+            )
+        if element_ids:
+            number_elements(elements)
+        return elements
+
+    def _compact_nodes(self, index: int, verbosity: Verbosity, short_classes: List[str],
+                       elements: List[CompactElement], borrowed: str, path: str) -> None:
+        """
+        Append description elements for a node and its subtree.
+
+        Args:
+            short_classes: Class names without their package, by class id
+            borrowed: Text an actionable ancestor already took from this subtree as its label
+            path: Tree position of the node
+        """
+        offset = index * 4
+        bounds = self.bounds
+        if bounds[offset + 2] <= bounds[offset] or bounds[offset + 3] <= bounds[offset + 1]:
+            return
+
+        own_label = self.label(index)
+        flags = self.flags[index]
+        if flags & ACTIONABLE:
+            # Containers scroll many children, so only tappable rows borrow a child's text
+            label = own_label or ("" if flags & SCROLLABLE else self.descendant_label(index))
+            node = self.node(index)
+            elements.append(CompactElement(path, node, label, describe_node(node, label, verbosity)))
+            if not own_label:
+                borrowed = label
+        elif own_label and verbosity >= Verbosity.NORMAL and own_label != borrowed:
+            node = self.node(index)
+            elements.append(CompactElement(path, node, own_label, describe_node(node, own_label, verbosity)))
+
+        for position, child in enumerate(self.children(index)):
+            self._compact_nodes(
+                child, verbosity, short_classes, elements, borrowed,
+                f"{path}/{short_classes[self.class_ids[child]]}{position}"
+            )
+
+    def to_nodes(self) -> List[UINode]:
+        """Build the equivalent UINode trees, for code working on ui_tree nodes"""
+        nodes = []
+        roots = []
+        for index in range(len(self)):
+            node = self.node(index)
+            nodes.append(node)
+            parent = self.parent[index]
+            (nodes[parent].children if parent >= 0 else roots).append(node)
+        return roots
+
+
+def _unescape(value: str) -> str:
+    return html.unescape(value) if '&' in value else value
+
+
+def _attribute_flags(attrs: Dict[str, str]) -> int:
+    flags = 0
+    for name, bit in FLAG_ATTRIBUTES.items():
+        if attrs.get(name, 'true' if name == 'enabled' else 'false') == 'true':
+            flags |= bit
+    return flags
+
+
+def _class_flags(class_name: str) -> int:
+    editable = _editable_cache.get(class_name)
+    if editable is None:
+        editable = _editable_cache[class_name] = class_name.rsplit('.', 1)[-1].endswith(EDITABLE_CLASSES)
+    return EDITABLE if editable else 0
+
+
+def parse_node_table(dump: Union[bytes, str], table: Optional[NodeTable] = None) -> NodeTable:
+    """
+    Parse a uiautomator dump into a NodeTable in one pass over the text.
+
+    Each node is matched by a single regular expression for the attribute
+    order uiautomator writes, so no per-element objects or attribute dicts
+    are created; nodes in any other shape are still parsed, more slowly.
+    Only double-quoted attributes are supported. Trailing output after the
+    XML, such as the dump status line, is ignored.
+
+    Args:
+        dump: Raw dump as bytes or text
+        table: Empty table to fill, e.g. one sharing string tables with an
+            earlier dump
+
+    Returns:
+        NodeTable: The parsed nodes
+
+    Raises:
+        ValueError: If the dump has no hierarchy or its nodes are unbalanced
+    """
+    if isinstance(dump, bytes):
+        dump = dump.decode('utf-8', 'replace')
+    if table is None:
+        table = NodeTable()
+
+    bounds, flags, parent, end = table.bounds, table.flags, table.parent, table.end
+    class_ids, resource_ids, package_ids = table.class_ids, table.resource_ids, table.package_ids
+    text, content_desc = table.text, table.content_desc
+    intern_class, intern_resource_id = table.classes.intern, table.resource_id_strings.intern
+    intern_package = table.packages.intern
+
+    open_nodes: List[int] = []
+    seen_hierarchy = False
+    for match in TAG_PATTERN.finditer(dump):
+        (node_text, resource_id, class_name, package, desc, booleans, x1, y1, x2, y2, closed,
+         attributes, generic_closed) = match.groups()
+
+        if booleans is not None:
+            node_flags = _flag_cache.get(booleans)
+            if node_flags is None:
+                node_flags = _flag_cache[booleans] = _attribute_flags(dict(ATTRIBUTE_PATTERN.findall(booleans)))
+            bounds.extend((int(x1), int(y1), int(x2), int(y2)))
+        elif attributes is not None:
+            attrs = dict(ATTRIBUTE_PATTERN.findall(attributes))
+            node_flags = _attribute_flags(attrs)
+            node_text, desc = attrs.get('text', ''), attrs.get('content-desc', '')
+            resource_id, class_name, package = attrs.get('resource-id', ''), attrs.get('class', ''), attrs.get('package', '')
+            bounds_match = BOUNDS_PATTERN.match(attrs.get('bounds', ''))
+            bounds.extend(map(int, bounds_match.groups()) if bounds_match else (0, 0, 0, 0))
+            closed = generic_closed
+        elif match.group(0) == '</node>':
+            if not open_nodes:
+                raise ValueError("Invalid UI hierarchy dump: unbalanced </node>")
+            end[open_nodes.pop()] = len(flags)
+            continue
+        else:
+            seen_hierarchy = True
+            continue
+
+        index = len(flags)
+        flags.append(node_flags | _class_flags(class_name))
+        parent.append(open_nodes[-1] if open_nodes else -1)
+        end.append(index + 1)
+        class_ids.append(intern_class(class_name))
+        resource_ids.append(intern_resource_id(resource_id))
+        package_ids.append(intern_package(package))
+        text.append(_unescape(node_text))
+        content_desc.append(_unescape(desc))
+        if not closed:
+            open_nodes.append(index)
+
+    if not seen_hierarchy:
+        raise ValueError("Invalid UI hierarchy dump: no <hierarchy> element")
+    if open_nodes:
+        raise ValueError("Invalid UI hierarchy dump: unclosed <node>")
+    return table
+
+
+def parse_nodes(dump: Union[bytes, str]) -> List[UINode]:
+    """
+    Faster equivalent of ui_tree.parse_hierarchy, going through a NodeTable.
+
+    Args:
+        dump: Raw uiautomator dump as bytes or text
+
+    Returns:
+        List of root nodes (one per window)
+
+    Raises:
+        ValueError: If the dump cannot be parsed
+    """
+    return parse_node_table(dump).to_nodes()
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import statistics
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from automator import AutomationCommand, Automator
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimings:
+    """Collects wall-clock durations per pipeline stage"""
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+
+    @contextmanager
+    def measure(self, stage: str):
+        """Context manager recording the duration of the enclosed block under `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[stage].append(time.perf_counter() - start)
+
+    def summary(self) -> str:
+        """Format count, mean, median and max per stage as a table"""
+        lines = [f"{'stage':<10} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9}"]
+        for stage, values in self.durations.items():
+            lines.append(
+                f"{stage:<10} {len(values):>6} {statistics.mean(values) * 1000:>9.1f} "
+                f"{statistics.median(values) * 1000:>9.1f} {max(values) * 1000:>9.1f}"
+            )
+        return "\n".join(lines)
+
+
+async def run_pipeline(automator: 'Automator', user_prompt: str,
+                       timings: Optional[StageTimings] = None) -> Optional['AutomationCommand']:
+    """
+    Run the automation loop with device and LLM work overlapped where possible.
+
+    Capture, inference and execution of a single step depend on each other,
+    but the LLM does not have to sit idle while the device works: as soon as
+    an action is sent, the next screen capture starts and, concurrently,
+    Ollama pre-evaluates the system prompt and history for the next query.
+    The first capture likewise overlaps with loading the model. Blocking
+    TouchInterface and Ollama calls run in worker threads, reusing the
+    automator's existing adb and HTTP connections.
+
+    Args:
+        automator: Configured Automator
+        user_prompt: User's test condition
+        timings: Collects per-stage durations, which are also logged at the end of the run
+
+    Returns:
+        The terminal END or ERROR command, or None if `config.max_steps`
+        was reached first, like Automator.run
+    """
+    if timings is None:
+        timings = StageTimings()
+
+    async def timed(stage: str, func, *args):
+        with timings.measure(stage):
+            return await asyncio.to_thread(func, *args)
+
+    max_steps = automator.config.max_steps
+    automator.start_run(user_prompt)
+
+    prefill = asyncio.create_task(timed("prefill", automator.prefill_llm, user_prompt))
+    try:
+        ui_hierarchy = await timed("capture", automator.get_ui_hierarchy)
+        while True:
+            logger.debug("Processing next automation cycle")
+            # Ollama serves requests in order; let the prefill finish so the query reuses it
+            await prefill
+
+            command = await timed("infer", automator.query_llm, ui_hierarchy, user_prompt)
+            if command.is_terminal:
+                logger.info(f"Automation ended with status: {command.command_type}")
+                automator.finish_run()
+                return command
+
+            await timed("execute", automator.execute_command, command)
+            automator.steps += 1
+            if max_steps and automator.steps >= max_steps:
+                logger.warning(f"Automation stopped after reaching max_steps ({max_steps})")
+                automator.finish_run()
+                return None
+
+            prefill = asyncio.create_task(timed("prefill", automator.prefill_llm, user_prompt))
+            ui_hierarchy = await timed("capture", automator.get_ui_hierarchy)
+    finally:
+        if not prefill.done():
+            prefill.cancel()
+        if timings.durations:
+            logger.info(f"Pipeline stage timings:\n{timings.summary()}")
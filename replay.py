@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MODES = ("record", "replay")
+
+
+@dataclass
+class TraceStep:
+    """One recorded step: the screen it was taken on and the LLM reply chosen for it"""
+    fingerprint: str
+    response: str
+    title: str = ""
+
+
+class TraceStore:
+    """
+    Recorded runs per tester prompt, persisted to a JSON trace file.
+
+    Safe to share between automators running in different threads, as
+    runner.py does, so runs recorded on one device are not overwritten by
+    another device saving its own.
+
+    Attributes:
+        path (str): JSON trace file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._traces: Dict[str, List[TraceStep]] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self.load()
+
+    def get(self, user_prompt: str) -> List[TraceStep]:
+        """Recorded steps for a tester prompt, empty if none"""
+        with self._lock:
+            return list(self._traces.get(user_prompt, []))
+
+    def put(self, user_prompt: str, steps: List[TraceStep]) -> None:
+        """Store the steps of a finished run and save the trace file"""
+        with self._lock:
+            self._traces[user_prompt] = list(steps)
+        self.save()
+
+    def load(self) -> None:
+        """Load recorded runs from the trace file"""
+        try:
+            with open(self.path, 'r') as f:
+                traces = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load trace from {self.path}: {e}")
+            return
+        with self._lock:
+            self._traces = {
+                prompt: [TraceStep(**step) for step in steps] for prompt, steps in traces.items()
+            }
+        logger.debug(f"Loaded traces for {len(self._traces)} prompts from {self.path}")
+
+    def save(self) -> None:
+        """Write recorded runs to the trace file"""
+        # Held while writing, so concurrent saves cannot interleave on the file
+        with self._lock:
+            traces = {prompt: [asdict(step) for step in steps] for prompt, steps in self._traces.items()}
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(traces, f, indent=1)
+            os.replace(tmp_path, self.path)
+
+
+class CommandTrace:
+    """
+    Records the commands of a run so a later run can replay them without the LLM.
+
+    The trace store maps each tester prompt to its steps. In record mode every
+    step's screen fingerprint and command are stored. In replay mode the
+    recorded command is reused whenever the current screen matches the next
+    recorded one (or one a few steps ahead, to resynchronise after a
+    divergence); otherwise the caller queries the LLM. Replayed runs are
+    recorded as well, so a trace heals itself when the app changes.
+
+    Attributes:
+        store (TraceStore): Recorded runs, possibly shared with other automators
+        mode (str): "record" or "replay"
+        lookahead (int): Recorded steps searched ahead of the expected one
+        replayed (int): Steps served from the trace in the current run
+        diverged (int): Steps that had to be sent to the LLM in the current run
+    """
+
+    def __init__(self, store: TraceStore, mode: str = "record", lookahead: int = 3):
+        if mode not in MODES:
+            raise ValueError(f"Unknown trace mode: {mode}")
+        self.store = store
+        self.mode = mode
+        self.lookahead = lookahead
+        self.replayed = 0
+        self.diverged = 0
+        self._prompt: Optional[str] = None
+        self._expected: List[TraceStep] = []
+        self._position = 0
+        self._recording: List[TraceStep] = []
+
+    @property
+    def replaying(self) -> bool:
+        """Whether recorded steps remain to be replayed in the current run"""
+        return self.mode == "replay" and self._position < len(self._expected)
+
+    def begin(self, user_prompt: str) -> None:
+        """Start a run for a tester prompt"""
+        self._prompt = user_prompt
+        self._recording = []
+        self._position = 0
+        self.replayed = 0
+        self.diverged = 0
+        self._expected = self.store.get(user_prompt) if self.mode == "replay" else []
+        if self.mode == "replay" and not self._expected:
+            logger.warning("No recorded trace for this prompt, every step will query the LLM")
+
+    def lookup(self, fingerprint: str) -> Optional[str]:
+        """
+        Return the recorded reply for the current screen, if the run is on track.
+
+        Args:
+            fingerprint: Fingerprint of the current screen
+
+        Returns:
+            The recorded command JSON, or None if the screen diverges from the trace
+        """
+        end = min(len(self._expected), self._position + 1 + self.lookahead)
+        for index in range(self._position, end):
+            step = self._expected[index]
+            if step.fingerprint == fingerprint:
+                if index != self._position:
+                    logger.info(f"Trace resynchronised, skipping {index - self._position} recorded steps")
+                self._position = index + 1
+                self.replayed += 1
+                logger.info(f"Replaying step {index + 1}/{len(self._expected)}: {step.response}")
+                return step.response
+
+        if self.replaying:
+            self.diverged += 1
+            logger.info(f"Screen diverged from recorded step {self._position + 1}, querying the LLM")
+        return None
+
+    def record(self, fingerprint: str, response: str, title: str = "") -> None:
+        """Append the step just decided to the current run's recording"""
+        self._recording.append(TraceStep(fingerprint, response, title))
+
+    def finish(self) -> None:
+        """Store the current run's recording under its prompt and save the trace"""
+        if self._prompt is None or not self._recording:
+            return
+        if self.mode == "replay":
+            logger.info(f"Replay finished: {self.replayed} steps replayed, {self.diverged} sent to the LLM")
+        self.store.put(self._prompt, self._recording)
+        self._recording = []
@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import dataclasses
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from adb_interface import ADBError, AndroidKeyCode, list_devices
+from automator import Automator, AutomatorConfig
+from command_cache import CommandCache
+from inference_broker import InferenceBroker
+from pipeline import run_pipeline
+from replay import CommandTrace, TraceStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TestResult:
+    """Outcome of one tester prompt run on one device"""
+    prompt: str
+    device_id: str
+    status: str
+    steps: int
+    duration: float
+    error: Optional[str] = None
+
+
+class DeviceRunner:
+    """
+    Runs a queue of tester prompts across all connected devices in parallel.
+
+    Each device gets its own worker thread, Automator and TouchInterface and
+    pulls the next prompt from a shared queue when it finishes one, so slow
+    tests do not hold up other devices. Automators share one command cache, so
+    a screen solved on one device is a cache hit on the others, one trace
+    store, so every device's recorded runs end up in the trace file, and one
+    inference broker, which bounds concurrent LLM requests to what the Ollama
+    server can process together. With `config.pipeline`, each device runs the
+    pipelined loop of pipeline.run_pipeline instead of Automator.run.
+
+    Attributes:
+        config (AutomatorConfig): Base configuration; device_id is set per device
+        devices (List[str]): Serials of the devices to run on
+    """
+
+    def __init__(self, config: AutomatorConfig, devices: Optional[List[str]] = None):
+        """
+        Initialize the runner.
+
+        Args:
+            config: Base configuration for every Automator
+            devices: Device serials to use; discovered with `adb devices` if omitted
+
+        Raises:
+            ADBError: If no devices are available
+        """
+        self.config = config
+        self.devices = devices if devices is not None else list_devices(config.adb_backend)
+        if not self.devices:
+            raise ADBError("No devices connected")
+
+        self.command_cache: Optional[CommandCache] = None
+        if config.command_cache_size > 0:
+            self.command_cache = CommandCache(config.command_cache_size, config.command_cache_file)
+        self.trace_store: Optional[TraceStore] = None
+        if config.trace_file:
+            self.trace_store = TraceStore(config.trace_file)
+        self.inference_broker = InferenceBroker(config.llm_parallelism)
+
+    def run(self, prompts: List[str]) -> List[TestResult]:
+        """
+        Run every prompt once, distributing them across devices.
+
+        Args:
+            prompts: Tester prompts to run
+
+        Returns:
+            List of TestResult, in completion order
+        """
+        pending: "queue.Queue[str]" = queue.Queue()
+        for prompt in prompts:
+            pending.put(prompt)
+
+        results: List[TestResult] = []
+        results_lock = threading.Lock()
+
+        workers = [
+            threading.Thread(target=self._worker, args=(device_id, pending, results, results_lock), daemon=True)
+            for device_id in self.devices
+        ]
+        logger.info(f"Running {len(prompts)} prompts on {len(workers)} devices")
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        if self.command_cache is not None:
+            self.command_cache.save()
+        return results
+
+    def _worker(
+            self,
+            device_id: str,
+            pending: "queue.Queue[str]",
+            results: List[TestResult],
+            results_lock: threading.Lock
+    ) -> None:
+        """Run prompts from the queue on one device until the queue is empty"""
+        try:
+            # The shared cache and trace store replace the per-automator ones
+            automator = Automator(dataclasses.replace(
+                self.config, device_id=device_id, command_cache_size=0, trace_file=None
+            ))
+        except Exception as e:
+            logger.error(f"Could not set up device {device_id}: {e}")
+            return
+        if self.command_cache is not None:
+            automator.command_cache = self.command_cache
+        if self.trace_store is not None:
+            automator.trace = CommandTrace(self.trace_store, self.config.trace_mode)
+        automator.inference_broker = self.inference_broker
+
+        try:
+            while True:
+                try:
+                    prompt = pending.get_nowait()
+                except queue.Empty:
+                    return
+
+                result = self._run_prompt(automator, device_id, prompt)
+                logger.info(f"[{device_id}] {result.status} after {result.steps} steps: {prompt}")
+                with results_lock:
+                    results.append(result)
+        finally:
+            # Not automator.close(), which would save the shared command cache once per device
+            automator.touch_interface.close()
+            if automator.telemetry is not None:
+                automator.telemetry.close()
+
+    @staticmethod
+    def _run_prompt(automator: Automator, device_id: str, prompt: str) -> TestResult:
+        """Run one prompt from the home screen and describe how it ended"""
+        start = time.monotonic()
+        try:
+            automator.touch_interface.press_key(AndroidKeyCode.HOME)
+            if automator.config.pipeline:
+                command = asyncio.run(run_pipeline(automator, prompt))
+            else:
+                command = automator.run(prompt)
+            status = command.command_type.value if command is not None else "max_steps"
+            error = None
+        except Exception as e:
+            status, error = "failed", str(e)
+        return TestResult(prompt, device_id, status, automator.steps, time.monotonic() - start, error)
+
+
+def format_results(results: List[TestResult]) -> str:
+    """Format results as a table followed by totals"""
+    lines = [f"{'device':<20} {'status':<10} {'steps':>5} {'seconds':>8}  prompt"]
+    for result in results:
+        lines.append(
+            f"{result.device_id:<20} {result.status:<10} {result.steps:>5} {result.duration:>8.1f}  {result.prompt}"
+        )
+    passed = sum(1 for result in results if result.status == "end")
+    lines.append(f"{passed}/{len(results)} ended successfully")
+    return "\n".join(lines)
+
+
+def main():
+    """Run every prompt in a file (one per line) across all connected devices"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('prompts', help="File with one tester prompt per line")
+    parser.add_argument('--config', default='config.yaml', help="Automator configuration file")
+    parser.add_argument('--devices', nargs='*', help="Device serials to use (default: all connected)")
+    args = parser.parse_args()
+
+    with open(args.prompts, 'r') as f:
+        prompts = [line.strip() for line in f if line.strip()]
+
+    runner = DeviceRunner(AutomatorConfig.from_yaml(args.config), args.devices)
+    results = runner.run(prompts)
+    print(format_results(results))
+    print(f"Inference broker: {runner.inference_broker.metrics().summary()}")
+    runner.inference_broker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import logging
+import time
+from typing import Optional
+
+from adb_interface import TouchInterface
+from node_table import parse_node_table
+
+logger = logging.getLogger(__name__)
+
+
+class SettleDetector:
+    """
+    Waits for the screen to stop changing before the UI hierarchy is captured.
+
+    Polls a cheap signal until it reads the same for `stable_polls` consecutive
+    polls, or the timeout expires. Two signals are supported:
+
+    - "focus": the focused window/app from `dumpsys window`, followed by a
+      single hierarchy capture once it is stable
+    - "hierarchy": the fingerprint of successive hierarchy captures, returning
+      the last capture so no extra dump is needed
+
+    The poll interval and timeout adapt to how long recent screens took to
+    settle, so quick apps are polled tightly and slow ones are given more time.
+
+    Attributes:
+        mode (str): Signal to poll, "focus" or "hierarchy"
+        poll_interval (float): Current seconds between polls
+        timeout (float): Current seconds to wait before capturing anyway
+    """
+
+    MIN_POLL_INTERVAL = 0.05
+    MAX_POLL_INTERVAL = 0.5
+    MIN_TIMEOUT = 1.0
+    MAX_TIMEOUT = 10.0
+
+    def __init__(
+            self,
+            touch_interface: TouchInterface,
+            mode: str = "focus",
+            poll_interval: float = 0.1,
+            timeout: float = 3.0,
+            stable_polls: int = 2,
+            adaptive: bool = True
+    ):
+        if mode not in ("focus", "hierarchy"):
+            raise ValueError(f"Unknown settle mode: {mode}")
+        self.touch_interface = touch_interface
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.stable_polls = stable_polls
+        self.adaptive = adaptive
+        self._average_settle: Optional[float] = None
+
+    def _adapt(self, settle_time: float) -> None:
+        """Update the moving average of settle times and derive poll interval and timeout"""
+        if not self.adaptive:
+            return
+        if self._average_settle is None:
+            self._average_settle = settle_time
+        else:
+            self._average_settle = 0.7 * self._average_settle + 0.3 * settle_time
+        self.poll_interval = min(max(self._average_settle / 4, self.MIN_POLL_INTERVAL), self.MAX_POLL_INTERVAL)
+        self.timeout = min(max(self._average_settle * 3, self.MIN_TIMEOUT), self.MAX_TIMEOUT)
+
+    def capture(self) -> str:
+        """
+        Wait for the screen to settle and capture its UI hierarchy.
+
+        Returns:
+            str: UI hierarchy XML of the settled screen
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        previous = None
+        readings = 0
+        ui_hierarchy = ""
+
+        while True:
+            if self.mode == "hierarchy":
+                ui_hierarchy = self.touch_interface.capture_ui_hierarchy()
+                signal = parse_node_table(ui_hierarchy).fingerprint()
+            else:
+                signal = self.touch_interface.get_window_focus()
+
+            readings = readings + 1 if signal == previous else 1
+            previous = signal
+            if readings >= self.stable_polls:
+                settled = True
+                break
+            if time.monotonic() >= deadline:
+                settled = False
+                break
+            time.sleep(self.poll_interval)
+
+        settle_time = time.monotonic() - start
+        if settled:
+            logger.debug(f"Screen settled after {settle_time:.2f}s")
+            self._adapt(settle_time)
+        else:
+            # Continuously animating screens would otherwise push the timeout up every step
+            logger.warning(f"Screen did not settle within {self.timeout:.2f}s, capturing anyway")
+
+        if self.mode == "hierarchy":
+            return ui_hierarchy
+        return self.touch_interface.capture_ui_hierarchy()
@@ -0,0 +1,218 @@
+import json
+import logging
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import IO, List, Optional
+
+from adb_interface import TouchInterface
+
+logger = logging.getLogger(__name__)
+
+# Stage timings summed per step, in the order they appear in the summary table
+STAGES = ("capture", "query", "inference", "execute", "adb")
+
+
+@dataclass
+class StepTelemetry:
+    """Measurements for one capture/query/execute cycle"""
+    step: int
+    timestamp: float
+    device: Optional[str] = None
+    wall_s: float = 0.0
+    capture_s: float = 0.0
+    query_s: float = 0.0
+    inference_s: float = 0.0
+    execute_s: float = 0.0
+    adb_s: float = 0.0
+    adb_calls: int = 0
+    xml_bytes: int = 0
+    screen_tokens: int = 0
+    prompt_tokens: int = 0
+    history_steps: int = 0
+    history_tokens: int = 0
+    cache_hit: bool = False
+    repairs: int = 0
+    first_token_s: Optional[float] = None
+    prompt_eval_count: Optional[int] = None
+    prompt_eval_s: Optional[float] = None
+    eval_count: Optional[int] = None
+    eval_s: Optional[float] = None
+    load_s: Optional[float] = None
+    command: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Telemetry:
+    """
+    Per-step timing and size measurements for the automation loop.
+
+    Stage durations, adb command time, hierarchy size, prompt token counts,
+    Ollama's evaluation statistics and history size are accumulated into a
+    StepTelemetry record for the step in progress. Each finished step is
+    appended to a JSONL trace (if a path is given) and kept for the summary
+    table logged when the telemetry is closed.
+
+    Attributes:
+        steps (List[StepTelemetry]): Finished steps
+    """
+
+    def __init__(self, trace_path: Optional[str] = None, device: Optional[str] = None):
+        """
+        Initialize the telemetry layer.
+
+        Args:
+            trace_path: Optional JSONL file that step records are appended to
+            device: Device serial stored in every record
+        """
+        self.device = device
+        self.steps: List[StepTelemetry] = []
+        self._current: Optional[StepTelemetry] = None
+        self._started = 0.0
+        self._lock = threading.Lock()
+        self._trace: Optional[IO[str]] = open(trace_path, 'a', encoding='utf-8') if trace_path else None
+
+    @property
+    def current(self) -> StepTelemetry:
+        """Record of the step in progress, started on first use"""
+        with self._lock:
+            if self._current is None:
+                self._current = StepTelemetry(step=len(self.steps) + 1, timestamp=time.time(), device=self.device)
+                self._started = time.perf_counter()
+            return self._current
+
+    @contextmanager
+    def measure(self, stage: str):
+        """Context manager adding the duration of the enclosed block to `<stage>_s` of the current step"""
+        step = self.current
+        start = time.perf_counter()
+        try:
+            yield step
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                setattr(step, f"{stage}_s", getattr(step, f"{stage}_s") + elapsed)
+
+    def instrument(self, touch_interface: TouchInterface) -> None:
+        """
+        Time every adb command issued by a touch interface.
+
+        Wraps the interface's `_run_adb_command`, which every backend funnels
+        its device commands through, so settle polling, captures and actions
+        are all counted.
+
+        Args:
+            touch_interface: Interface to instrument
+        """
+        run_adb_command = touch_interface._run_adb_command
+
+        def timed(command: list) -> str:
+            start = time.perf_counter()
+            try:
+                return run_adb_command(command)
+            finally:
+                self.record_adb(time.perf_counter() - start)
+
+        touch_interface._run_adb_command = timed
+
+    def record_adb(self, seconds: float) -> None:
+        """Add one adb command's duration to the current step"""
+        step = self.current
+        with self._lock:
+            step.adb_s += seconds
+            step.adb_calls += 1
+
+    def record_llm_response(self, response) -> None:
+        """
+        Copy Ollama's token counts and durations from a chat response.
+
+        Only the final message of a response carries these statistics; a
+        stream closed as soon as the command arrived never receives it, in
+        which case the streamed chunk count stands in for `eval_count`.
+
+        Args:
+            response: Non-streaming ChatResponse or final stream chunk
+        """
+        step = self.current
+        if response.get('prompt_eval_count') is not None:
+            step.prompt_eval_count = response['prompt_eval_count']
+        if response.get('eval_count') is not None:
+            step.eval_count = response['eval_count']
+        for field, key in (('prompt_eval_s', 'prompt_eval_duration'), ('eval_s', 'eval_duration'),
+                           ('load_s', 'load_duration')):
+            if response.get(key) is not None:
+                setattr(step, field, response[key] / 1e9)
+
+    def end_step(self, command: Optional[str] = None, error: Optional[str] = None) -> Optional[StepTelemetry]:
+        """
+        Finish the current step, writing it to the trace.
+
+        Args:
+            command: Raw command chosen for the step
+            error: Error message if the step failed
+
+        Returns:
+            The finished record, or None if no step was in progress
+        """
+        with self._lock:
+            step, self._current = self._current, None
+            if step is None:
+                return None
+            step.wall_s = time.perf_counter() - self._started
+            step.command = command
+            step.error = error
+            self.steps.append(step)
+            if self._trace is not None:
+                self._trace.write(json.dumps(asdict(step)) + "\n")
+                self._trace.flush()
+        return step
+
+    def summary(self) -> str:
+        """Format per-stage time and per-step size statistics as a table"""
+        if not self.steps:
+            return "no steps recorded"
+
+        wall = [step.wall_s for step in self.steps]
+        total_wall = sum(wall)
+        lines = [
+            f"{'stage':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'total s':>8} {'share':>6}"
+        ]
+        for stage, values in [(stage, [getattr(step, f"{stage}_s") for step in self.steps]) for stage in STAGES] + [
+            ("step", wall)
+        ]:
+            lines.append(
+                f"{stage:<10} {statistics.mean(values) * 1000:>9.1f} {_percentile(values, 0.5) * 1000:>9.1f} "
+                f"{_percentile(values, 0.95) * 1000:>9.1f} {max(values) * 1000:>9.1f} {sum(values):>8.2f} "
+                f"{sum(values) / total_wall if total_wall else 0:>6.0%}"
+            )
+
+        def mean(field: str) -> float:
+            values = [getattr(step, field) for step in self.steps if getattr(step, field) is not None]
+            return statistics.mean(values) if values else 0.0
+
+        lines.append(
+            f"{len(self.steps)} steps, mean per step: {mean('adb_calls'):.1f} adb calls, "
+            f"{mean('xml_bytes') / 1024:.1f} KB XML, {mean('prompt_tokens'):.0f} prompt tokens "
+            f"({mean('screen_tokens'):.0f} screen, {mean('history_tokens'):.0f} history), "
+            f"{mean('eval_count'):.0f} output tokens, {mean('history_steps'):.1f} history steps, "
+            f"{sum(step.cache_hit for step in self.steps)} cache hits, "
+            f"{sum(step.repairs for step in self.steps)} repair requests"
+        )
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        """Finish any step in progress, log the summary table and close the trace"""
+        if self._current is not None:
+            self.end_step(error="incomplete")
+        if self.steps:
+            logger.info(f"Step telemetry:\n{self.summary()}")
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
@@ -0,0 +1,76 @@
+import os
+import sys
+from contextlib import contextmanager
+from typing import List
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "benchmarks"))
+
+from automator import Automator, AutomatorConfig, CommandType  # noqa: E402
+from fake_device import SimulatedDevice, default_screens, start_fake_device  # noqa: E402
+from fake_ollama import StubOllamaServer  # noqa: E402
+from node_table import parse_node_table  # noqa: E402
+
+SCREENS = {name: default_screens()[name] for name in ("home", "Settings")}
+
+
+@pytest.fixture(scope="module")
+def adb():
+    """One fake adb server for the module, since adb_client reads the server port once on import"""
+    server = start_fake_device(SCREENS)
+    previous_port = os.environ.get("ANDROID_ADB_SERVER_PORT")
+    os.environ["ANDROID_ADB_SERVER_PORT"] = str(server.port)
+    yield server
+    server.stop()
+    if previous_port is None:
+        del os.environ["ANDROID_ADB_SERVER_PORT"]
+    else:
+        os.environ["ANDROID_ADB_SERVER_PORT"] = previous_port
+
+
+@contextmanager
+def simulated_automator(adb, replies: List[str]):
+    """An Automator on a fresh simulated device whose LLM sends `replies` in order, repeating the last"""
+    adb.device = SimulatedDevice(SCREENS)
+    llm = StubOllamaServer(lambda: replies.pop(0) if len(replies) > 1 else replies[0]).start()
+    automator = None
+    try:
+        automator = Automator(AutomatorConfig(
+            prompt_file=os.path.join(os.path.dirname(TESTS_DIR), "prompt.txt"), llm_model="stub",
+            ollama_host=llm.host, adb_backend="socket", settle_mode="off", max_steps=40
+        ))
+        yield automator, llm
+    finally:
+        if automator is not None:
+            automator.touch_interface.close()
+        llm.stop()
+
+
+def test_screen_cycle_is_not_replayed_from_the_cache(adb):
+    """home -> Settings -> back -> home ... must keep asking the LLM until it ends the test"""
+    home = parse_node_table(SCREENS["home"].replace("{clock}", "12:30").replace("{battery}", "80"))
+    settings_x, settings_y = home.center(home.text.index("Settings"))
+    replies = [f"touch {settings_x} {settings_y}", "key 4"] * 3 + ["end"]
+
+    with simulated_automator(adb, replies) as (automator, llm):
+        command = automator.run("Open Settings and go back three times")
+
+        assert command is not None and command.command_type == CommandType.END
+        assert llm.requests == 7
+
+
+def test_replay_that_leaves_the_screen_unchanged_is_evicted(adb):
+    """A cached tap on empty space is replayed once in a later run, then dropped"""
+    with simulated_automator(adb, ["touch 5 5", "end"]) as (automator, llm):
+        automator.run("Tap the corner")
+        assert len(automator.command_cache) == 1
+
+        llm.reply = lambda: "end"
+        command = automator.run("Tap the corner")
+
+        assert command.command_type == CommandType.END
+        assert automator.command_cache.hits == 1
+        assert len(automator.command_cache) == 0
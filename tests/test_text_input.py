@@ -0,0 +1,48 @@
+import os
+import shlex
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_input import KEYCODE_ENTER, input_text_commands  # noqa: E402
+
+
+def typed_text(commands):
+    """What the device types for the commands, decoding `%s` the way `input text` does"""
+    typed = []
+    for command in commands:
+        args = shlex.split(command)
+        if args[:2] == ['input', 'keyevent'] and args[2] == str(KEYCODE_ENTER):
+            typed.append("\n")
+            continue
+        assert args[:2] == ['input', 'text'] and len(args) == 3
+        text = list(args[2])
+        escaped = False
+        index = 0
+        while index < len(text):
+            if escaped:
+                escaped = False
+                if text[index] == 's':
+                    text[index] = ' '
+                    del text[index - 1]
+                    index -= 1
+            if text[index] == '%':
+                escaped = True
+            index += 1
+        typed.append("".join(text))
+    return "".join(typed)
+
+
+@pytest.mark.parametrize("text", [
+    "hello world",
+    "it's a \"test\"; echo $HOME & exit",
+    "100%sure",
+    "%s",
+    "a %s b",
+    "%%s% s%",
+    "two\nlines %s",
+])
+def test_input_text_commands_type_the_text_unchanged(text):
+    assert typed_text(input_text_commands(text, chunk_size=4)) == text
@@ -0,0 +1,121 @@
+import base64
+import logging
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from adb_interface import TouchInterface
+
+logger = logging.getLogger(__name__)
+
+ADB_KEYBOARD_IME = "com.android.adbkeyboard/.AdbIME"
+KEYCODE_ENTER = 66
+
+
+def escape_input_text(text: str) -> str:
+    """
+    Quote text for `input text` run through the device shell.
+
+    Spaces become `%s` (which `input text` turns back into spaces) and the
+    result is single-quoted so shell metacharacters are passed literally.
+    `input text` has no escape for `%`, so a literal `%s` in the text would
+    also become a space; input_text_commands splits such text between calls.
+    """
+    return "'" + text.replace(" ", "%s").replace("'", "'\\''") + "'"
+
+
+def input_text_commands(text: str, chunk_size: int = 200) -> List[str]:
+    """
+    Shell commands typing the text with `input text`, chunked and escaped.
+
+    Newlines are sent as ENTER key events between the chunks, and a literal
+    `%s` is split after the `%` so `input text` does not type it as a space.
+    """
+    commands = []
+    for index, line in enumerate(text.split("\n")):
+        if index:
+            commands.append(f"input keyevent {KEYCODE_ENTER}")
+        segments = line.split("%s")
+        for position, segment in enumerate(segments):
+            if position:
+                segment = "s" + segment
+            if position < len(segments) - 1:
+                segment += "%"
+            for start in range(0, len(segment), chunk_size):
+                commands.append(f"input text {escape_input_text(segment[start:start + chunk_size])}")
+    return commands
+
+
+class TextEntryEngine:
+    """
+    Enters text on the device using the fastest method that handles the payload.
+
+    - "ime": when the ADBKeyBoard IME is the active input method, the text is
+      sent base64-encoded in a single broadcast and committed in one go,
+      regardless of length or characters.
+    - "input": otherwise, `input text` with spaces and shell metacharacters
+      escaped, split into chunks (and at newlines, which are sent as ENTER)
+      that all run in one shell invocation.
+
+    Attributes:
+        chunk_size (int): Maximum characters per `input text` call
+    """
+
+    def __init__(self, touch_interface: 'TouchInterface', chunk_size: int = 200):
+        self.touch_interface = touch_interface
+        self.chunk_size = chunk_size
+        self._ime_active: Optional[bool] = None
+
+    @property
+    def ime_active(self) -> bool:
+        """Whether ADBKeyBoard is the current input method (checked once)"""
+        if self._ime_active is None:
+            # Query directly rather than through _run_shell_command, which may be batching
+            try:
+                current = self.touch_interface._run_adb_command(
+                    ['shell', 'settings', 'get', 'secure', 'default_input_method']
+                )
+                self._ime_active = current.strip() == ADB_KEYBOARD_IME
+            except Exception as e:
+                logger.debug(f"Could not read the current input method: {e}")
+                self._ime_active = False
+        return self._ime_active
+
+    def choose_method(self, text: str) -> str:
+        """
+        Pick the text entry method for a payload.
+
+        Raises:
+            ValueError: If the text contains characters `input text` cannot type
+                and no IME is available
+        """
+        if self.ime_active:
+            return "ime"
+        if not text.isascii():
+            raise ValueError("Non-ASCII text requires the ADBKeyBoard IME to be active")
+        return "input"
+
+    def input_text_commands(self, text: str) -> List[str]:
+        """Shell commands typing the text with `input text`, chunked and escaped"""
+        return input_text_commands(text, self.chunk_size)
+
+    @staticmethod
+    def ime_command(text: str) -> str:
+        """Shell command committing the text through the ADBKeyBoard IME"""
+        encoded = base64.b64encode(text.encode('utf-8')).decode('ascii')
+        return f"am broadcast -a ADB_INPUT_B64 --es msg {encoded}"
+
+    def enter(self, text: str) -> None:
+        """
+        Type text into the focused field.
+
+        Args:
+            text: Text to enter; spaces, newlines and special characters are preserved
+        """
+        if not text:
+            return
+        method = self.choose_method(text)
+        logger.debug(f"Entering {len(text)} characters via {method}")
+        if method == "ime":
+            self.touch_interface._run_shell_command([self.ime_command(text)])
+        else:
+            self.touch_interface._run_shell_command([" && ".join(self.input_text_commands(text))])
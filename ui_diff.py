@@ -0,0 +1,150 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from ui_tree import CompactElement, format_screen, is_volatile
+
+logger = logging.getLogger(__name__)
+
+# Appended to the system prompt when screens may be sent as changes
+DIFF_PROMPT = """
+###SCREEN CHANGES###
+When only part of the screen changed since the previous step, the screen is sent as changes instead of in full:
+"changes <package>" then "anchor" with the screen title and the number of unchanged elements, followed by one line per change:
+"+ <element>" appeared, "- <element>" disappeared, "~ <element>" text or state changed (with "was \"<old text>\""), "> <element> was at X,Y" moved.
+Elements not listed are unchanged and keep the coordinates given in earlier steps.
+###END SCREEN CHANGES###
+"""
+
+
+@dataclass
+class ScreenDiff:
+    """Element-level changes between two compact screen descriptions"""
+    added: List[CompactElement] = field(default_factory=list)
+    removed: List[CompactElement] = field(default_factory=list)
+    text_changed: List[Tuple[CompactElement, CompactElement]] = field(default_factory=list)
+    moved: List[Tuple[CompactElement, CompactElement]] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> int:
+        """Number of changed elements"""
+        return len(self.added) + len(self.removed) + len(self.text_changed) + len(self.moved)
+
+
+def diff_elements(old: List[CompactElement], new: List[CompactElement]) -> ScreenDiff:
+    """
+    Compare two element lists, matching elements by their tree path.
+
+    Status bar elements are ignored, since their clock and battery text
+    changes constantly.
+
+    Args:
+        old: Elements of the previous screen
+        new: Elements of the current screen
+
+    Returns:
+        ScreenDiff: Added, removed, relabelled and moved elements
+    """
+    diff = ScreenDiff()
+    previous = {element.path: element for element in old if not is_volatile(element.node)}
+    for element in new:
+        if is_volatile(element.node):
+            continue
+        before = previous.pop(element.path, None)
+        if before is None or before.node.class_name != element.node.class_name:
+            diff.added.append(element)
+            if before is not None:
+                diff.removed.append(before)
+        elif before.label != element.label:
+            diff.text_changed.append((before, element))
+        elif before.node.bounds != element.node.bounds:
+            diff.moved.append((before, element))
+        elif before.line != element.line:
+            # Same text and position, but flags such as checked or enabled changed
+            diff.text_changed.append((before, element))
+        else:
+            diff.unchanged += 1
+    diff.removed.extend(previous.values())
+    return diff
+
+
+def _short(element: CompactElement) -> str:
+    """An element's class and label, for elements that are no longer on screen"""
+    return f'{element.node.short_class} "{element.label}"' if element.label else element.node.short_class
+
+
+class ScreenDiffer:
+    """
+    Describes each screen relative to the previous one when little has changed.
+
+    Keeps the previous step's elements and, for a screen of the same app
+    whose share of changed elements stays under `threshold`, returns only
+    the changes plus a short anchor line. A full snapshot is sent for the
+    first screen, on app changes, when most of the screen changed, and after
+    `max_deltas` consecutive deltas, so a full snapshot is always among the
+    steps the history still sends verbatim.
+
+    Attributes:
+        threshold (float): Largest fraction of changed elements sent as a delta
+        max_deltas (int): Consecutive deltas before a full snapshot is forced
+    """
+
+    def __init__(self, threshold: float = 0.4, max_deltas: int = 3):
+        self.threshold = threshold
+        self.max_deltas = max_deltas
+        self._previous: Optional[List[CompactElement]] = None
+        self._package = ""
+        self._deltas = 0
+
+    def reset(self) -> None:
+        """Forget the previous screen, so the next one is sent in full"""
+        self._previous = None
+        self._deltas = 0
+
+    def describe(self, elements: List[CompactElement], package: str, title: Callable[[], str]) -> str:
+        """
+        Describe the screen as a full compact snapshot or as changes.
+
+        Args:
+            elements: Elements of the current screen, e.g. numbered with element ids
+            package: Package of the foreground app
+            title: Returns the screen title for the anchor line; only called for deltas
+
+        Returns:
+            str: Compact screen description or delta
+        """
+        previous, previous_package = self._previous, self._package
+        self._previous, self._package = elements, package
+
+        if previous is None or package != previous_package or self._deltas >= self.max_deltas:
+            return self._snapshot(package, elements)
+
+        diff = diff_elements(previous, elements)
+        if diff.changed > self.threshold * max(len(previous), len(elements), 1):
+            return self._snapshot(package, elements)
+
+        self._deltas += 1
+        logger.debug(f"Sending {diff.changed} changed elements ({diff.unchanged} unchanged)")
+        return self._format(diff, package, title())
+
+    def _snapshot(self, package: str, elements: List[CompactElement]) -> str:
+        self._deltas = 0
+        return format_screen(package, elements)
+
+    @staticmethod
+    def _format(diff: ScreenDiff, package: str, title: str) -> str:
+        if not diff.changed:
+            return f'unchanged {package}\nanchor "{title}", all {diff.unchanged} elements unchanged'
+
+        lines = [f"changes {package}", f'anchor "{title}", {diff.unchanged} elements unchanged']
+        lines.extend(f"- {_short(element)}" for element in diff.removed)
+        lines.extend(f"+ {element.line}" for element in diff.added)
+        lines.extend(
+            f'~ {after.line} was "{before.label}"' if before.label != after.label else f"~ {after.line}"
+            for before, after in diff.text_changed
+        )
+        lines.extend(
+            "> {} was at {},{}".format(after.line, *before.node.center) for before, after in diff.moved
+        )
+        return "\n".join(lines)
@@ -0,0 +1,267 @@
+import logging
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BOUNDS_PATTERN = re.compile(r'\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]')
+EDITABLE_CLASSES = ('EditText', 'AutoCompleteTextView', 'SearchView')
+VOLATILE_PACKAGES = ('com.android.systemui',)
+VOLATILE_TEXT_PATTERN = re.compile(
+    r'\b\d{1,2}:\d{2}(:\d{2})?(\s?[AaPp]\.?[Mm]\.?)?\b|\b\d{1,3}\s?(%|percent)'
+)
+
+# Appended to the system prompt when actionable elements are numbered
+ELEMENT_ID_PROMPT = """
+###ELEMENT IDS###
+Elements you can act on start with an id, for example `#17 540,300 Button "OK" [click]`.
+To touch one of them reply with "tap <id>" instead of "touch <X> <Y>", for example {"command":"tap 17"}.
+Ids only refer to elements of the current screen. Use "touch" for positions without an id.
+###END ELEMENT IDS###
+"""
+
+
+class Verbosity(IntEnum):
+    """How much detail the compact screen description includes"""
+    MINIMAL = 0   # Actionable elements and their labels only
+    NORMAL = 1    # Plus visible text that is not already a label
+    DETAILED = 2  # Plus resource ids, full bounds and state flags
+
+
+@dataclass
+class CompactElement:
+    """One line of a compact screen description"""
+    path: str  # Position of the node in the tree, stable across dumps of the same layout
+    node: 'UINode'
+    label: str
+    line: str
+    element_id: Optional[int] = None  # Set for actionable elements when ids are requested
+
+
+@dataclass
+class UINode:
+    """A single element of a uiautomator hierarchy dump"""
+    class_name: str
+    bounds: Tuple[int, int, int, int]
+    text: str = ""
+    content_desc: str = ""
+    resource_id: str = ""
+    package: str = ""
+    clickable: bool = False
+    long_clickable: bool = False
+    scrollable: bool = False
+    checkable: bool = False
+    checked: bool = False
+    focused: bool = False
+    selected: bool = False
+    enabled: bool = True
+    children: List['UINode'] = field(default_factory=list)
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        """Pixel coordinates of the centre of the element"""
+        x1, y1, x2, y2 = self.bounds
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    @property
+    def short_class(self) -> str:
+        """Class name without its package, e.g. "Button" """
+        return self.class_name.rsplit('.', 1)[-1]
+
+    @property
+    def area(self) -> int:
+        """Screen area covered by the element in pixels"""
+        x1, y1, x2, y2 = self.bounds
+        return max(0, x2 - x1) * max(0, y2 - y1)
+
+    @property
+    def visible(self) -> bool:
+        """Whether the element occupies any screen area"""
+        x1, y1, x2, y2 = self.bounds
+        return x2 > x1 and y2 > y1
+
+    @property
+    def editable(self) -> bool:
+        """Whether the element accepts text input"""
+        return self.short_class.endswith(EDITABLE_CLASSES)
+
+    @property
+    def actionable(self) -> bool:
+        """Whether the element reacts to taps, scrolls or text input"""
+        return self.clickable or self.long_clickable or self.scrollable or self.checkable or self.editable
+
+    @property
+    def label(self) -> str:
+        """The element's own visible text or content description"""
+        return self.text or self.content_desc
+
+
+def parse_bounds(bounds: str) -> Tuple[int, int, int, int]:
+    """
+    Parse a uiautomator bounds string such as "[0,0][1080,1920]".
+
+    Returns:
+        Tuple of (x1, y1, x2, y2), or all zeros if the string is malformed
+    """
+    match = BOUNDS_PATTERN.match(bounds)
+    if not match:
+        return 0, 0, 0, 0
+    return tuple(int(value) for value in match.groups())
+
+
+def _build_node(element: ET.Element) -> UINode:
+    attrs = element.attrib
+    return UINode(
+        class_name=attrs.get('class', ''),
+        bounds=parse_bounds(attrs.get('bounds', '')),
+        text=attrs.get('text', ''),
+        content_desc=attrs.get('content-desc', ''),
+        resource_id=attrs.get('resource-id', ''),
+        package=attrs.get('package', ''),
+        clickable=attrs.get('clickable') == 'true',
+        long_clickable=attrs.get('long-clickable') == 'true',
+        scrollable=attrs.get('scrollable') == 'true',
+        checkable=attrs.get('checkable') == 'true',
+        checked=attrs.get('checked') == 'true',
+        focused=attrs.get('focused') == 'true',
+        selected=attrs.get('selected') == 'true',
+        enabled=attrs.get('enabled', 'true') == 'true',
+        children=[_build_node(child) for child in element if child.tag == 'node']
+    )
+
+
+def parse_hierarchy(ui_hierarchy: str) -> List[UINode]:
+    """
+    Parse a uiautomator XML dump into a tree of UINode objects.
+
+    Args:
+        ui_hierarchy: Raw XML produced by `uiautomator dump`
+
+    Returns:
+        List of root nodes (one per window)
+
+    Raises:
+        ValueError: If the XML cannot be parsed
+    """
+    try:
+        root = ET.fromstring(ui_hierarchy)
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid UI hierarchy XML: {e}")
+    return [_build_node(child) for child in root if child.tag == 'node']
+
+
+def _clean_text(text: str, limit: Optional[int]) -> str:
+    text = " ".join(text.split()).replace('"', "'")
+    if limit is not None and len(text) > limit:
+        return text[:limit - 1] + "…"
+    return text
+
+
+def describe_node(node: UINode, label: str, verbosity: Verbosity) -> str:
+    """One compact description line for a node, shown with the given label"""
+    x, y = node.center
+    parts = [f"{x},{y}", node.short_class]
+    if label:
+        parts.append(f'"{_clean_text(label, None if verbosity >= Verbosity.DETAILED else 80)}"')
+    if node.content_desc and node.content_desc != label:
+        parts.append(f'desc="{_clean_text(node.content_desc, 80)}"')
+
+    if verbosity >= Verbosity.DETAILED:
+        if node.resource_id:
+            parts.append(f"id={node.resource_id.split('/')[-1]}")
+        parts.append("[{},{}][{},{}]".format(*node.bounds))
+
+    flags = []
+    if node.clickable:
+        flags.append("click")
+    if node.long_clickable:
+        flags.append("long")
+    if node.scrollable:
+        flags.append("scroll")
+    if node.editable:
+        flags.append("edit")
+    if node.checkable:
+        flags.append("checked" if node.checked else "unchecked")
+    if verbosity >= Verbosity.DETAILED:
+        if node.focused:
+            flags.append("focused")
+        if node.selected:
+            flags.append("selected")
+    if not node.enabled:
+        flags.append("disabled")
+    if flags:
+        parts.append(" ".join(flags).join("[]"))
+
+    return " ".join(parts)
+
+
+def number_elements(elements: List[CompactElement]) -> None:
+    """
+    Give actionable elements ids from 1 in document order and prefix their lines with `#<id>`.
+
+    Status bar elements are skipped, so the same screen always gets the same ids.
+    """
+    next_id = 1
+    for element in elements:
+        if element.node.actionable and not is_volatile(element.node):
+            element.element_id = next_id
+            element.line = f"#{next_id} {element.line}"
+            next_id += 1
+
+
+def format_screen(package: str, elements: List[CompactElement]) -> str:
+    """
+    Join compact elements into a screen description headed by the app package.
+
+    Args:
+        package: Package of the foreground app, from NodeTable.screen_package
+        elements: Elements returned by NodeTable.compact_elements
+
+    Returns:
+        str: Compact screen description
+    """
+    lines = [f"screen {package}"] if package else []
+    lines.extend(element.line for element in elements)
+    return "\n".join(lines)
+
+
+class ElementIndex:
+    """
+    Resolves the element ids of the latest screen description to tap targets.
+
+    The index is replaced on every screen, so a lookup is a list access and
+    an id always refers to the screen the LLM was last shown.
+    """
+
+    def __init__(self):
+        self._elements: List[CompactElement] = []
+
+    def __len__(self) -> int:
+        return len(self._elements)
+
+    def update(self, elements: List[CompactElement]) -> None:
+        """Index the numbered elements of a new screen description"""
+        self._elements = [element for element in elements if element.element_id is not None]
+
+    def element(self, element_id: int) -> CompactElement:
+        """
+        Look up an element by id.
+
+        Raises:
+            ValueError: If no element of the current screen has the id
+        """
+        if not 1 <= element_id <= len(self._elements):
+            raise ValueError(f"Unknown element id {element_id}, the screen has ids 1-{len(self._elements)}")
+        return self._elements[element_id - 1]
+
+    def center(self, element_id: int) -> Tuple[int, int]:
+        """Pixel coordinates to tap for an element id"""
+        return self.element(element_id).node.center
+
+
+def is_volatile(node: UINode) -> bool:
+    """Whether a node belongs to the status bar or other system chrome"""
+    return node.package in VOLATILE_PACKAGES or node.resource_id.startswith(VOLATILE_PACKAGES)